@@ -1,19 +1,20 @@
-from IPython.display import display
+import numpy as np
 from qiskit import BasicAer, QuantumCircuit, QuantumRegister, execute
 from qiskit.circuit.library import MCMT
 from qiskit.circuit.library.standard_gates import CZGate
-from qiskit.quantum_info import Statevector
-from qiskit.visualization import array_to_latex
+
+from util.display import draw_circuit
+from util.grover import grover_amplitudes, phase_oracle
+from util.report import print_states, probabilities
+from util.statevector import IncrementalStatevector, display_statevector
+
+FILENAME = "./docs/_static/amplitude_amplification.png"
 
 # Set up the program
 n_qubits = 4
 number_to_flip = 3
 number_of_iterations = 2
-reg = QuantumRegister(n_qubits, name="reg")
-qc = QuantumCircuit(reg)
-qc.h(reg)
-x_bits = ~number_to_flip  # Perform bit flip. Here, `~x` is equivalent to `(-x) - 1`.
-x_list = [reg[x] for x in range(n_qubits) if x_bits & (1 << x)]
+fast_grover = False  # Apply the iterations directly to the amplitudes, without simulating the gates
 
 # Create multi controlled-z gate
 mtcx = MCMT(gate=CZGate(), num_ctrl_qubits=n_qubits - 1, num_target_qubits=1)
@@ -35,49 +36,76 @@ def diffuser(n):
     return gate
 
 
-# Verify statevector
-print(f"Statevector after 0 amplitude amplification iteration")
-ket = Statevector(qc)
-display(array_to_latex(ket, precision=3, prefix="\\psi =", max_size=2**n_qubits))
-
-# Amplitude amplification cycle
-for i in range(number_of_iterations):
-    # Flip the marked value
-    qc.barrier()
-    qc.x(x_list)
-    qc.compose(mtcx, qubits=range(n_qubits), inplace=True)
-    qc.x(x_list)
-
-    # Apply the diffuser
-    qc.barrier()
-    qc.append(diffuser(n_qubits), range(n_qubits))
-
-    # Verify statevector
-    print(f"Statevector after {i+1} amplitude amplification iteration")
-    ket = Statevector(qc)
-    display(array_to_latex(ket, precision=3, prefix="\\psi =", max_size=2**n_qubits))
-
-# Run circuit
-backend = BasicAer.get_backend("statevector_simulator")
-job = execute(qc, backend)
-result = job.result()
-
-print("Final state probabilities")
-outputstate = result.get_statevector(qc, decimals=3)
-total_prob = 0
-for i, amp in enumerate(outputstate):
-    if abs(amp) > 0.000001:
-        prob = abs(amp) * abs(amp)
-        total_prob += prob
-        print("|{}⟩ {} probability = {}%".format(i, amp, round(prob * 100, 5)))
-print("Total probability: {}%".format(int(round(total_prob * 100))))
-
-# Draw the circuit
-qc.draw(
-    output="mpl",
-    style="iqp",
-    cregbundle=False,
-    initial_state=True,
-    fold=-1,
-    filename="./docs/_static/amplitude_amplification.png",
-)
+# Build the circuit, calling `verify(qc, i)` after each iteration i
+def build(verify=None) -> QuantumCircuit:
+    verify = verify or (lambda qc, i: None)
+    reg = QuantumRegister(n_qubits, name="reg")
+    qc = QuantumCircuit(reg)
+    qc.h(reg)
+    x_bits = (
+        ~number_to_flip
+    )  # Perform bit flip. Here, `~x` is equivalent to `(-x) - 1`.
+    x_list = [reg[x] for x in range(n_qubits) if x_bits & (1 << x)]
+    verify(qc, 0)
+
+    # Amplitude amplification cycle
+    for i in range(number_of_iterations):
+        # Flip the marked value
+        qc.barrier()
+        qc.x(x_list)
+        qc.compose(mtcx, qubits=range(n_qubits), inplace=True)
+        qc.x(x_list)
+
+        # Apply the diffuser
+        qc.barrier()
+        qc.append(diffuser(n_qubits), range(n_qubits))
+
+        # Verify statevector
+        verify(qc, i + 1)
+
+    return qc
+
+
+def run(draw=True):
+    sim = None
+
+    # Verify statevector, simulating only the instructions appended since the last check
+    def verify(qc, i):
+        nonlocal sim
+        if fast_grover:
+            return
+        if sim is None:
+            sim = IncrementalStatevector(qc)
+        print(f"Statevector after {i} amplitude amplification iteration")
+        ket = sim.update()
+        if draw:
+            display_statevector(ket, max_size=2**n_qubits)
+
+    qc = build(verify)
+
+    if fast_grover:
+        # The diffuser gate above carries a global phase of -1 per iteration
+        oracle = phase_oracle(n_qubits, [number_to_flip])
+        amplitudes = grover_amplitudes(oracle, number_of_iterations)
+        outputstate = np.round((-1) ** number_of_iterations * amplitudes, 3)
+    else:
+        # Run circuit
+        backend = BasicAer.get_backend("statevector_simulator")
+        job = execute(qc, backend)
+        result = job.result()
+        outputstate = result.get_statevector(qc, decimals=3)
+
+    print("Final state probabilities")
+    print_states(outputstate)
+    total_prob = sum(probabilities(outputstate).values())
+    print("Total probability: {}%".format(int(round(total_prob * 100))))
+
+    # Draw the circuit
+    if draw:
+        draw_circuit(qc, FILENAME)
+
+    return outputstate
+
+
+if __name__ == "__main__":
+    run()
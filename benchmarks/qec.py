@@ -0,0 +1,151 @@
+import argparse
+import itertools
+import json
+import platform
+import sys
+import time
+from typing import Callable, Dict, List
+
+import pymatching
+
+import stim
+from util.qec import CODES, circuit_string
+
+# Stages of the sampling pipeline, in order. Times are in seconds, except for
+# "sample" and "decode" which are in seconds per shot.
+STAGES = ("generate", "parse", "dem", "compile", "sample", "decode")
+
+
+def best_time(fn: Callable[[], object], repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def benchmark_case(
+    code: str, distance: int, rounds: int, p: float, shots: int, repeat: int
+) -> Dict[str, float]:
+    # Times each stage of the pipeline for one circuit.
+    text = circuit_string(code, distance, rounds, p)
+    circuit = stim.Circuit(text)
+    dem = circuit.detector_error_model(decompose_errors=True)
+    sampler = circuit.compile_detector_sampler(seed=0)
+    matching = pymatching.Matching.from_detector_error_model(dem)
+    detection_events = sampler.sample(shots)
+
+    return {
+        "generate": best_time(
+            lambda: circuit_string(code, distance, rounds, p), repeat
+        ),
+        "parse": best_time(lambda: stim.Circuit(text), repeat),
+        "dem": best_time(
+            lambda: circuit.detector_error_model(decompose_errors=True), repeat
+        ),
+        "compile": best_time(lambda: circuit.compile_detector_sampler(), repeat),
+        "sample": best_time(lambda: sampler.sample(shots), repeat) / shots,
+        "decode": best_time(lambda: matching.decode_batch(detection_events), repeat)
+        / shots,
+    }
+
+
+def run(
+    codes: List[str],
+    distances: List[int],
+    rounds: List[int],
+    p: float,
+    shots: int,
+    repeat: int,
+) -> dict:
+    results = []
+    for code, distance, r in itertools.product(codes, distances, rounds):
+        times = benchmark_case(code, distance, r, p, shots, repeat)
+        results.append(
+            {
+                "code": code,
+                "distance": distance,
+                "rounds": r,
+                "p": p,
+                "shots": shots,
+                "seconds": times,
+                "shots_per_second": 1 / times["sample"],
+                "decodes_per_second": 1 / times["decode"],
+            }
+        )
+    return {
+        "metadata": {
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "stim": stim.__version__,
+            "pymatching": pymatching.__version__,
+        },
+        "results": results,
+    }
+
+
+def compare(report: dict, baseline: dict, threshold: float) -> List[str]:
+    # Returns a description of every stage that got slower than the baseline
+    # by more than the `threshold` fraction, for cases present in both.
+
+    def key(result):
+        return result["code"], result["distance"], result["rounds"], result["p"]
+
+    old = {key(r): r["seconds"] for r in baseline["results"]}
+    regressions = []
+    for result in report["results"]:
+        if key(result) not in old:
+            continue
+        for stage, seconds in result["seconds"].items():
+            before = old[key(result)].get(stage)
+            if before and seconds > before * (1 + threshold):
+                regressions.append(
+                    f"{result['code']} d={result['distance']} r={result['rounds']} "
+                    f"{stage}: {before:.3e}s -> {seconds:.3e}s "
+                    f"({seconds / before - 1:+.0%})"
+                )
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark QEC circuit generation, sampling and decoding."
+    )
+    parser.add_argument("--codes", nargs="+", default=list(CODES), choices=CODES)
+    parser.add_argument("--distances", nargs="+", type=int, default=[3, 5, 7, 9])
+    parser.add_argument("--rounds", nargs="+", type=int, default=[3, 10])
+    parser.add_argument("--p", type=float, default=0.001)
+    parser.add_argument("--shots", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="Write the results to this JSON file.")
+    parser.add_argument("--baseline", help="Compare against this JSON file.")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="Fractional slowdown over the baseline that counts as a regression.",
+    )
+    args = parser.parse_args()
+
+    report = run(
+        args.codes, args.distances, args.rounds, args.p, args.shots, args.repeat
+    )
+
+    print(f"{'code':<13}{'d':>4}{'r':>5}" + "".join(f"{s:>12}" for s in STAGES))
+    for result in report["results"]:
+        print(
+            f"{result['code']:<13}{result['distance']:>4}{result['rounds']:>5}"
+            + "".join(f"{result['seconds'][s]:>12.3e}" for s in STAGES)
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,53 @@
+import argparse
+import timeit
+
+from util.qec import CODES, _load_module
+
+# Loaded by path, as in `util.qec`, because the `stim` folder would otherwise
+# shadow the `stim` package
+_surface_code = _load_module(CODES["surface_code"][0])
+surface_code_circuit = _surface_code.surface_code_circuit
+surface_code_circuit_string = _surface_code.surface_code_circuit_string
+
+
+def time_generation(distances, rounds, p, repeat):
+    # Returns the best-of-`repeat` time, in seconds, to generate the circuit
+    #  string and the parsed `stim.Circuit` for each distance.
+    results = []
+    for distance in distances:
+        string_time = min(
+            timeit.repeat(
+                lambda: surface_code_circuit_string(distance, rounds, p),
+                number=1,
+                repeat=repeat,
+            )
+        )
+        circuit_time = min(
+            timeit.repeat(
+                lambda: surface_code_circuit(distance, rounds, p),
+                number=1,
+                repeat=repeat,
+            )
+        )
+        results.append((distance, string_time, circuit_time))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Time surface code circuit generation against code distance."
+    )
+    parser.add_argument("--min-distance", type=int, default=3)
+    parser.add_argument("--max-distance", type=int, default=51)
+    parser.add_argument("--step", type=int, default=4)
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--p", type=float, default=0.001)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    distances = range(args.min_distance, args.max_distance + 1, args.step)
+    print(f"{'distance':>8} {'string [ms]':>12} {'stim.Circuit [ms]':>18}")
+    for distance, string_time, circuit_time in time_generation(
+        distances, args.rounds, args.p, args.repeat
+    ):
+        print(f"{distance:>8} {string_time * 1e3:>12.3f} {circuit_time * 1e3:>18.3f}")
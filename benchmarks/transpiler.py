@@ -0,0 +1,117 @@
+import argparse
+import itertools
+import json
+import platform
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List
+
+import qiskit
+from qiskit import transpile
+from qiskit.providers.fake_provider import GenericBackendV2
+
+from transpile import build
+
+# Per-pass profile of transpiling the Y+CX fan-out circuit of `transpile.py`
+# onto `GenericBackendV2` backends of the same width. A pass-manager callback
+# records each pass's wall time, and the depth, size and gate counts of the
+# circuit after it.
+
+
+def benchmark_case(width: int, optimization_level: int, seed: int) -> Dict:
+    qc = build(width)
+    backend = GenericBackendV2(num_qubits=width, seed=seed)
+    passes = []
+
+    def callback(pass_, dag, time, count, **kwargs):
+        passes.append(
+            {
+                "index": count,
+                "pass": type(pass_).__name__,
+                "seconds": time,
+                "depth": dag.depth(),
+                "size": dag.size(),
+                "ops": dict(dag.count_ops()),
+            }
+        )
+
+    start = time.perf_counter()
+    t_qc = transpile(
+        qc,
+        backend,
+        optimization_level=optimization_level,
+        seed_transpiler=seed,
+        callback=callback,
+    )
+    wall_seconds = time.perf_counter() - start
+
+    # The pass times exclude the callback, whose depth and gate counts add up
+    # on wide circuits, so they are summed for the total rather than timed
+    # around `transpile`.
+    by_pass = defaultdict(float)
+    for record in passes:
+        by_pass[record["pass"]] += record["seconds"]
+    return {
+        "width": width,
+        "optimization_level": optimization_level,
+        "seconds": sum(by_pass.values()),
+        "wall_seconds": wall_seconds,
+        "depth": t_qc.depth(),
+        "size": t_qc.size(),
+        "ops": dict(t_qc.count_ops()),
+        "seconds_by_pass": dict(sorted(by_pass.items(), key=lambda kv: -kv[1])),
+        "passes": passes,
+    }
+
+
+def run(widths: List[int], levels: List[int], seed: int) -> dict:
+    results = [
+        benchmark_case(width, level, seed)
+        for width, level in itertools.product(widths, levels)
+    ]
+    return {
+        "metadata": {
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "qiskit": qiskit.__version__,
+            "seed": seed,
+        },
+        "results": results,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Profile the transpiler passes on a fan-out circuit."
+    )
+    parser.add_argument("--widths", nargs="+", type=int, default=[3, 10, 30, 100, 300])
+    parser.add_argument(
+        "--levels", nargs="+", type=int, default=[0, 1, 2, 3], choices=range(4)
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--top", type=int, default=3, help="Number of slowest passes to show."
+    )
+    parser.add_argument("--output", help="Write the results to this JSON file.")
+    args = parser.parse_args()
+
+    report = run(args.widths, args.levels, args.seed)
+
+    print(
+        f"{'width':>6}{'level':>6}{'seconds':>10}{'depth':>7}{'size':>7}  slowest passes"
+    )
+    for result in report["results"]:
+        slowest = ", ".join(
+            f"{name} {seconds / result['seconds']:.0%}"
+            for name, seconds in list(result["seconds_by_pass"].items())[: args.top]
+        )
+        print(
+            f"{result['width']:>6}{result['optimization_level']:>6}"
+            f"{result['seconds']:>10.3f}{result['depth']:>7}{result['size']:>7}"
+            f"  {slowest}"
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
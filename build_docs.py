@@ -0,0 +1,92 @@
+import argparse
+import hashlib
+import importlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent
+MANIFEST = ROOT / "docs" / "_static" / "manifest.json"
+
+# Build the circuit diagrams of the examples into `docs/_static`. Each example's
+# circuit is built in a process pool and fingerprinted, and it is drawn only if
+# its fingerprint differs from the one recorded in the manifest, or its image
+# is missing.
+
+
+def diagram_fingerprint(qc) -> str:
+    # Fingerprint of everything that shows in a diagram: the circuit structure,
+    # the register names, the gate labels, the layout, and the versions of the
+    # renderer.
+    import matplotlib
+    import qiskit
+
+    from util.simulation import circuit_fingerprint
+
+    h = hashlib.sha256(circuit_fingerprint(qc).encode())
+    for register in qc.qregs + qc.cregs:
+        h.update(f"{register.name}:{register.size};".encode())
+    for instruction in qc.data:
+        h.update(f"{getattr(instruction.operation, 'label', None)};".encode())
+    if qc.layout is not None:
+        h.update(repr(qc.layout.initial_index_layout()).encode())
+    h.update(f"{qiskit.__version__};{matplotlib.__version__}".encode())
+    return h.hexdigest()
+
+
+def build_diagram(name, previous=None, force=False):
+    # Build an example's diagram and draw it if it changed. Returns the image
+    # path relative to the root, the fingerprint and whether it was drawn.
+    module = importlib.import_module(name)
+    qc = module.build()
+    if hasattr(module, "diagram"):
+        qc = module.diagram(qc)
+    fingerprint = diagram_fingerprint(qc)
+    filename = Path(module.FILENAME)
+    drawn = force or fingerprint != previous or not filename.exists()
+    if drawn:
+        import matplotlib.pyplot as plt
+
+        from util.display import draw_circuit
+
+        draw_circuit(qc, filename)
+        plt.close("all")
+    return filename.as_posix(), fingerprint, drawn
+
+
+def build(examples, workers=None, force=False):
+    manifest = json.loads(MANIFEST.read_text()) if MANIFEST.exists() else {}
+    examples = [e for e in examples if hasattr(importlib.import_module(e), "FILENAME")]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            name: pool.submit(build_diagram, name, manifest.get(name), force)
+            for name in examples
+        }
+        for name, future in futures.items():
+            filename, fingerprint, drawn = future.result()
+            manifest[name] = fingerprint
+            print(f"{'drew' if drawn else 'kept'} {filename}")
+
+    MANIFEST.write_text(json.dumps(manifest, indent=2, sort_keys=True) + "\n")
+    return manifest
+
+
+if __name__ == "__main__":
+    from run import EXAMPLES
+
+    parser = argparse.ArgumentParser(description="Build the diagrams in docs/_static.")
+    parser.add_argument(
+        "examples", nargs="*", metavar="example", help=f"One of {', '.join(EXAMPLES)}."
+    )
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument(
+        "--force", action="store_true", help="Redraw even unchanged diagrams."
+    )
+    args = parser.parse_args()
+    unknown = set(args.examples) - set(EXAMPLES)
+    if unknown:
+        parser.error(f"Unknown examples: {', '.join(sorted(unknown))}.")
+
+    os.chdir(ROOT)  # The examples' image paths are relative to the root
+    build(args.examples or EXAMPLES, args.workers, args.force)
@@ -1,8 +1,14 @@
-from qiskit import BasicAer, QuantumCircuit, QuantumRegister, execute
+import numpy as np
+from qiskit import QuantumCircuit, QuantumRegister
 from qiskit.circuit import Gate
-from qiskit.circuit.library import MCMT, OR
+from qiskit.circuit.library import MCMT
 from qiskit.circuit.library.standard_gates import CZGate
 
+from util.cnf import cnf, num_ancillas, oracle_circuit, phase_diagonal
+from util.display import draw_circuit
+from util.grover import grover_amplitudes
+from util.report import print_states
+from util.simulation import simulate_statevector
 from util.statevector import get_partial_statevector
 
 
@@ -23,113 +29,82 @@ def diffuser(n) -> Gate:
     return gate
 
 
+FILENAME = "./docs/_static/phase_logic.png"
+number_of_iterations = 2
+fast_grover = False  # Apply the iterations directly to the amplitudes, without simulating the gates
+
+# Statement: `(a OR b) AND ((NOT a) OR c) AND ((NOT b) OR (NOT c)) AND (a OR c)`,
+# with variables a, b and c numbered 1, 2 and 3.
+statement = cnf([[1, 2], [-1, 3], [-2, -3], [1, 3]])
+
+
 # Phase-logic circuit to flip the relative phases of all input states for which the statement evaluates to TRUE.
-# Statement: `(a OR b) AND ((NOT a) OR c) AND ((NOT b) OR (NOT c)) AND (a OR c)`
 def phase_flip() -> QuantumCircuit:
-    a = QuantumRegister(1, name="a")
-    b = QuantumRegister(1, name="b")
-    c = QuantumRegister(1, name="c")
-    scratch_length = 4
-    scratch = QuantumRegister(scratch_length, name="scratch")
-    qc = QuantumCircuit(a, b, c, scratch)
-
-    # Clause 1: (a OR b)
-    clause_1 = OR(num_variable_qubits=2, flags=[1, 1], mcx_mode="noancilla").to_gate(
-        label="OR"
-    )
-    qc.append(clause_1, qargs=[a, b, scratch[0]])
+    return oracle_circuit(statement)
+
+
+def build() -> QuantumCircuit:
+    # Set up register and ancilla qubits.
+    reg_a = QuantumRegister(1, name="a")
+    reg_b = QuantumRegister(1, name="b")
+    reg_c = QuantumRegister(1, name="c")
+    reg_length = len(reg_a) + len(reg_b) + len(reg_c)
+    ancilla_length = num_ancillas(statement)
+    ancilla = QuantumRegister(ancilla_length, name="ancilla")
+    qc = QuantumCircuit(reg_a, reg_b, reg_c, ancilla)
+    qc.h([*range(0, reg_length)])
     qc.barrier()
 
-    # Clause 2: ((NOT a) OR c)
-    clause_2 = OR(num_variable_qubits=2, flags=[-1, 1], mcx_mode="noancilla").to_gate(
-        label="OR"
-    )
-    qc.append(clause_2, qargs=[a, c, scratch[1]])
-    qc.barrier()
+    # Amplitude amplification cycle
+    for i in range(number_of_iterations):
+        # Flip the marked value
+        qc_phase_flip = phase_flip()
+        qc.compose(qc_phase_flip, qubits=qc.qubits, inplace=True)
+        qc.barrier()
 
-    # Clause 3: ((NOT b) OR (NOT c))
-    clause_3 = OR(num_variable_qubits=2, flags=[-1, -1], mcx_mode="noancilla").to_gate(
-        label="OR"
-    )
-    qc.append(clause_3, qargs=[b, c, scratch[2]])
-    qc.barrier()
+        # Apply the diffuser
+        qc.append(diffuser(reg_length), range(reg_length))
+        qc.barrier()
 
-    # Clause 4: (a OR c)
-    clause_4 = OR(num_variable_qubits=2, flags=[1, 1], mcx_mode="noancilla").to_gate(
-        label="OR"
-    )
-    qc.append(clause_4, qargs=[a, c, scratch[3]])
-    qc.barrier()
+    return qc
 
-    # Phase AND gate
-    mtcz = MCMT(gate=CZGate(), num_ctrl_qubits=scratch_length - 1, num_target_qubits=1)
-    qc.compose(mtcz, qubits=scratch[:], inplace=True)
-    qc.barrier()
 
-    # Uncompute Clause 4
-    qc.append(clause_4.inverse(), qargs=[a, c, scratch[3]])
-    qc.barrier()
+def diagram(qc) -> QuantumCircuit:
+    return qc.decompose(
+        gates_to_decompose=["OR", "or", "or_dg", "mcmt", "diffuser"], reps=2
+    )
 
-    # Uncompute Clause 3
-    qc.append(clause_3.inverse(), qargs=[b, c, scratch[2]])
-    qc.barrier()
 
-    # Uncompute Clause 2
-    qc.append(clause_2.inverse(), qargs=[a, c, scratch[1]])
-    qc.barrier()
+def run(draw=True):
+    qc = build()
+    reg_length = statement.num_variables
 
-    # Uncompute Clause 1
-    qc.append(clause_1.inverse(), qargs=[a, b, scratch[0]])
+    if fast_grover:
+        # Evaluate the statement over all assignments instead of simulating the scratch qubits
+        amplitudes = grover_amplitudes(phase_diagonal(statement), number_of_iterations)
+        outputstate = np.abs(amplitudes) ** 2
+    else:
+        # Run circuit
+        state = simulate_statevector(qc)
 
-    return qc
+        # Output statevector
+        outputstate = get_partial_statevector(
+            state,
+            qargs=[*range(reg_length, qc.num_qubits)],
+            label="register",
+            show=draw,
+        )
 
+    # Output state probabilities
+    print("Output state probabilities")
+    print_states(outputstate, decimals=3)
 
-# Set up register and ancilla qubits.
-reg_a = QuantumRegister(1, name="a")
-reg_b = QuantumRegister(1, name="b")
-reg_c = QuantumRegister(1, name="c")
-reg_length = len(reg_a) + len(reg_b) + len(reg_c)
-ancilla_length = 4
-ancilla = QuantumRegister(ancilla_length, name="ancilla")
-qc = QuantumCircuit(reg_a, reg_b, reg_c, ancilla)
-qc.h([*range(0, reg_length)])
-qc.barrier()
+    # Draw the circuit
+    if draw:
+        draw_circuit(diagram(qc), FILENAME)
 
-# Amplitude amplification cycle
-number_of_iterations = 2
-for i in range(number_of_iterations):
-    # Flip the marked value
-    qc_phase_flip = phase_flip()
-    qc.compose(qc_phase_flip, qubits=qc.qubits, inplace=True)
-    qc.barrier()
+    return outputstate
 
-    # Apply the diffuser
-    qc.append(diffuser(reg_length), range(reg_length))
-    qc.barrier()
 
-# Run circuit
-backend = BasicAer.get_backend("statevector_simulator")
-job = execute(qc, backend)
-result = job.result()
-
-# Output statevector
-outputstate = get_partial_statevector(
-    qc, qargs=[*range(reg_length, qc.num_qubits)], label="register"
-)
-
-# Output state probabilities
-print("Output state probabilities")
-for i, amp in enumerate(outputstate):
-    if abs(amp) > 0.000001:
-        prob = abs(amp) * abs(amp)
-        print(f"|{i}⟩ {amp} probability = {round(prob * 100, 3)}%")
-
-# Draw the circuit
-qc.decompose(gates_to_decompose=["OR", "or", "or_dg", "mcmt", "diffuser"], reps=2).draw(
-    output="mpl",
-    style="iqp",
-    cregbundle=False,
-    initial_state=True,
-    fold=-1,
-    filename="./docs/_static/phase_logic.png",
-)
+if __name__ == "__main__":
+    run()
@@ -1,50 +1,106 @@
 import math
 
-from qiskit import BasicAer, QuantumCircuit, QuantumRegister, execute
+import numpy as np
+from qiskit import QuantumCircuit, QuantumRegister
+from qiskit.circuit import ParameterVector
 from qiskit.circuit.library import QFT
 
-# Set up
-signal = QuantumRegister(4, name="signal")
-qc = QuantumCircuit(signal)
+from util.batch import batch_probabilities
+from util.display import draw_circuit
+from util.report import print_states
+from util.simulation import simulate_statevector
 
-# Prepare the signal
+FILENAME = "./docs/_static/quantum_fourier_transform.png"
+
+signal_length = 4
 which_signal = "B"  # Desired signal
-qc.h(signal)
-if which_signal == "A":
-    qc.rz(math.radians(180), signal[0])
-elif which_signal == "B":
-    qc.rz(math.radians(90), signal[0])
-    qc.rz(math.radians(180), signal[1])
-elif which_signal == "C":
-    qc.rz(math.radians(45), signal[0])
-    qc.rz(math.radians(90), signal[1])
-    qc.rz(math.radians(180), signal[2])
-elif which_signal == "D":  # Square-wave signal
-    qc.rz(math.radians(180), signal[2])
-
-# Perform Quantum Fourier Transform
-qc.barrier()
-qft = QFT(num_qubits=len(signal)).to_gate(label="QFT")
-qc.append(qft, qargs=range(len(signal)))
-qc.barrier()
-
-# Run circuit
-backend = BasicAer.get_backend("statevector_simulator")
-job = execute(qc, backend)
-result = job.result()
-
-outputstate = result.get_statevector(qc, decimals=3)
-for i, amp in enumerate(outputstate):
-    if abs(amp) > 0.000001:
-        prob = abs(amp) * abs(amp)
-        print("|{}⟩ {} probability = {}%".format(i, amp, round(prob * 100, 5)))
-
-# Draw the circuit
-qc.decompose(gates_to_decompose="QFT", reps=2).draw(
-    output="mpl",
-    style="iqp",
-    cregbundle=False,
-    initial_state=True,
-    fold=-1,
-    filename="./docs/_static/quantum_fourier_transform.png",
-)
+batch_signals = False  # Also evaluate all the signals below in one batched pass
+signal_angles = {  # `rz` angles, in degrees, of each signal qubit
+    "A": [180, 0, 0, 0],
+    "B": [90, 180, 0, 0],
+    "C": [45, 90, 180, 0],
+    "D": [0, 0, 180, 0],
+}
+
+
+def build() -> QuantumCircuit:
+    # Set up
+    signal = QuantumRegister(signal_length, name="signal")
+    qc = QuantumCircuit(signal)
+
+    # Prepare the signal
+    qc.h(signal)
+    if which_signal == "A":
+        qc.rz(math.radians(180), signal[0])
+    elif which_signal == "B":
+        qc.rz(math.radians(90), signal[0])
+        qc.rz(math.radians(180), signal[1])
+    elif which_signal == "C":
+        qc.rz(math.radians(45), signal[0])
+        qc.rz(math.radians(90), signal[1])
+        qc.rz(math.radians(180), signal[2])
+    elif which_signal == "D":  # Square-wave signal
+        qc.rz(math.radians(180), signal[2])
+
+    # Perform Quantum Fourier Transform
+    qc.barrier()
+    qft = QFT(num_qubits=len(signal)).to_gate(label="QFT")
+    qc.append(qft, qargs=range(len(signal)))
+    qc.barrier()
+
+    return qc
+
+
+# Parameterized circuit, with the `rz` angles as parameters
+def build_batch() -> QuantumCircuit:
+    signal = QuantumRegister(signal_length, name="signal")
+    angles = ParameterVector("angle", len(signal))
+    qc = QuantumCircuit(signal)
+    qc.h(signal)
+    for i in range(len(signal)):
+        qc.rz(angles[i], signal[i])
+    qc.append(
+        QFT(num_qubits=len(signal)).to_gate(label="QFT"), qargs=range(len(signal))
+    )
+    return qc
+
+
+def diagram(qc) -> QuantumCircuit:
+    return qc.decompose(gates_to_decompose="QFT", reps=2)
+
+
+# Evaluate all the signals in one pass
+def run_batch():
+    probabilities = batch_probabilities(
+        build_batch(), np.radians(list(signal_angles.values()))
+    )
+    print("Batch of signals")
+    for name, probs in zip(signal_angles, probabilities):
+        peaks = np.nonzero(probs > 0.000001)[0]
+        print(
+            f"Signal {name}: "
+            + ", ".join(f"|{i}⟩ {round(probs[i] * 100, 5)}%" for i in peaks)
+        )
+
+    return probabilities
+
+
+def run(draw=True):
+    qc = build()
+
+    # Run circuit. The QFT is simulated as an FFT over the signal qubits.
+    outputstate = np.round(simulate_statevector(qc).data, 3)
+    print_states(outputstate)
+
+    if batch_signals:
+        run_batch()
+
+    # Draw the circuit
+    if draw:
+        draw_circuit(diagram(qc), FILENAME)
+
+    return outputstate
+
+
+if __name__ == "__main__":
+    run()
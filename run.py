@@ -0,0 +1,80 @@
+import argparse
+import importlib
+import sys
+import time
+
+START = time.perf_counter()
+
+EXAMPLES = [
+    "swap_test",
+    "teleport",
+    "arithmetic",
+    "scratch_qubit",
+    "amplitude_amplification",
+    "quantum_fourier_transform",
+    "phase_estimation",
+    "phase_logic",
+    "transpile",
+]
+
+
+class FirstWrite:
+    # Wraps a stream, recording when something is first written to it.
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.first = None
+
+    def write(self, text):
+        if self.first is None and text.strip():
+            self.first = time.perf_counter()
+        return self.stream.write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+
+def run_example(name, draw=True):
+    # Import and run an example. Returns the seconds taken to import it, to
+    # print its first result and to finish, since the start of the program.
+    module = importlib.import_module(name)
+    imported = time.perf_counter()
+    stdout = sys.stdout
+    sys.stdout = FirstWrite(stdout)
+    try:
+        module.run(draw=draw)
+        first = sys.stdout.first
+    finally:
+        sys.stdout = stdout
+    done = time.perf_counter()
+    return {
+        "import": imported - START,
+        "first_result": (first or done) - START,
+        "total": done - START,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the examples.")
+    parser.add_argument(
+        "examples", nargs="*", metavar="example", help=f"One of {', '.join(EXAMPLES)}."
+    )
+    parser.add_argument(
+        "--no-draw",
+        action="store_true",
+        help="Skip the LaTeX displays and circuit diagrams.",
+    )
+    args = parser.parse_args()
+    unknown = set(args.examples) - set(EXAMPLES)
+    if unknown:
+        parser.error(f"Unknown examples: {', '.join(sorted(unknown))}.")
+
+    for name in args.examples or EXAMPLES:
+        print(f"== {name}")
+        times = run_example(name, draw=not args.no_draw)
+        print(
+            f"{name}: imported in {times['import']:.3f}s, "
+            f"first result at {times['first_result']:.3f}s, "
+            f"done at {times['total']:.3f}s",
+            file=sys.stderr,
+        )
@@ -0,0 +1,174 @@
+import argparse
+
+import numpy as np
+import pymatching
+from rep_code import create_rep_code_stim_string
+
+import stim
+
+# Classical simulation of the repetition code memory experiment built by
+# `create_rep_code_stim_string`. The circuit only resets, measures and applies
+# CX gates in the Z basis, so only the X (bit-flip) component of each noise
+# channel matters:
+#   - X_ERROR(p) flips a bit with probability p.
+#   - DEPOLARIZE1(p) flips a bit with probability 2p/3 (X or Y).
+#   - DEPOLARIZE2(p) flips the (control, target) bits by (1, 0), (0, 1) or
+#     (1, 1), each with probability 4p/15.
+# Bits are simulated as boolean arrays over (shots, qubits), one round at a
+# time, and detectors are the XOR of measurements along the time axis.
+
+
+def _flips(rng, p, shape):
+    return rng.random(shape) < p
+
+
+def _pair_flips(rng, p, shape):
+    # (control, target) flips are (1, 0) for u < 4p/15, (0, 1) for
+    # u < 8p/15 and (1, 1) for u < 12p/15.
+    u = rng.random(shape) * 15 / p if p else np.full(shape, np.inf)
+    control = (u < 4) | ((u >= 8) & (u < 12))
+    target = (u >= 4) & (u < 12)
+    return control, target
+
+
+def sample_rep_code(distance, rounds, p, shots, rng=None):
+    # Returns detection events of shape (shots, num_detectors), observable
+    # flips of shape (shots, 1) and the final data readout of shape
+    # (shots, distance), in the same order as the Stim circuit.
+    rng = np.random.default_rng(rng)
+    nd = distance  # number of data qubits
+    nm = distance - 1  # number of measure qubits
+    num_rounds = max(rounds, 2)
+    measures = np.empty((shots, num_rounds, nm), dtype=bool)
+
+    data = _flips(rng, p, (shots, nd))  # reset errors
+    for r in range(num_rounds):
+        last_round = r == num_rounds - 1
+        if r > 0:
+            data ^= _flips(rng, 2 * p / 3, (shots, nd))
+        m = _flips(rng, p, (shots, nm))  # reset errors
+
+        # CX down: data k controls measure k.
+        m ^= data[:, :-1]
+        control, target = _pair_flips(rng, p, (shots, nm))
+        data[:, :-1] ^= control
+        m ^= target
+        data[:, -1] ^= _flips(rng, 2 * p / 3, shots)
+
+        # CX up: data k+1 controls measure k.
+        m ^= data[:, 1:]
+        data[:, 0] ^= _flips(rng, 2 * p / 3, shots)
+        control, target = _pair_flips(rng, p, (shots, nm))
+        data[:, 1:] ^= control
+        m ^= target
+
+        measures[:, r] = m ^ _flips(rng, p, (shots, nm))
+        if not last_round:
+            data ^= _flips(rng, 2 * p / 3, (shots, nd))
+
+    data ^= _flips(rng, p, (shots, nd))  # final readout errors
+
+    detectors = measures.copy()
+    detectors[:, 1:] ^= measures[:, :-1]
+    data_detectors = measures[:, -1] ^ data[:, :-1] ^ data[:, 1:]
+    detection_events = np.concatenate(
+        (detectors.reshape(shots, -1), data_detectors), axis=1
+    )
+    observable_flips = data[:, -1:]
+    return detection_events, observable_flips, data
+
+
+def majority_vote_errors(data):
+    # Counts shots whose majority-voted data readout is flipped.
+    return int(np.sum(2 * data.sum(axis=1) > data.shape[1]))
+
+
+def matching_decoder(distance, rounds, p):
+    circuit = stim.Circuit(create_rep_code_stim_string(distance, rounds, p))
+    return pymatching.Matching.from_detector_error_model(
+        circuit.detector_error_model(decompose_errors=True)
+    )
+
+
+def count_logical_errors(
+    distance, rounds, p, shots, decoder="matching", chunk_size=10_000, seed=None
+):
+    # Counts logical errors over `shots` shots, sampled in chunks so that
+    # memory is bounded by chunk_size * rounds * distance bits.
+    rng = np.random.default_rng(seed)
+    matching = matching_decoder(distance, rounds, p) if decoder == "matching" else None
+    errors = 0
+    for start in range(0, shots, chunk_size):
+        num_shots = min(chunk_size, shots - start)
+        detection_events, observable_flips, data = sample_rep_code(
+            distance, rounds, p, num_shots, rng
+        )
+        if decoder == "majority":
+            errors += majority_vote_errors(data)
+        elif decoder == "matching":
+            predictions = matching.decode_batch(detection_events)
+            errors += int(np.sum(np.any(predictions != observable_flips, axis=1)))
+        else:
+            raise ValueError(f"Unknown decoder {decoder!r}.")
+    return errors
+
+
+def cross_check(distance, rounds, p, shots, seed=None):
+    # Compares the classical engine against Stim sampling of the same circuit.
+    # Returns the largest absolute z-score of the differences in per-detector
+    # detection rates and observable flip rate, which should stay within a few
+    # units when both samplers are equivalent, along with the matching-decoded
+    # logical error rate of each sampler.
+    circuit = stim.Circuit(create_rep_code_stim_string(distance, rounds, p))
+    stim_dets, stim_obs = circuit.compile_detector_sampler(seed=seed).sample(
+        shots, separate_observables=True
+    )
+    dets, obs, _ = sample_rep_code(distance, rounds, p, shots, seed)
+    if dets.shape != stim_dets.shape:
+        raise ValueError(f"Detector shapes differ: {dets.shape} != {stim_dets.shape}")
+
+    classical = np.concatenate((dets, obs), axis=1).mean(axis=0)
+    reference = np.concatenate((stim_dets, stim_obs), axis=1).mean(axis=0)
+    pooled = (classical + reference) / 2
+    std = np.sqrt(np.maximum(2 * pooled * (1 - pooled) / shots, 1e-12))
+
+    matching = matching_decoder(distance, rounds, p)
+
+    def logical_error_rate(detection_events, observable_flips):
+        predictions = matching.decode_batch(detection_events)
+        return np.mean(np.any(predictions != observable_flips, axis=1))
+
+    return {
+        "max_z": float(np.max(np.abs(classical - reference) / std)),
+        "classical_logical_error_rate": float(logical_error_rate(dets, obs)),
+        "stim_logical_error_rate": float(logical_error_rate(stim_dets, stim_obs)),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Classical repetition code memory experiment."
+    )
+    parser.add_argument("--distance", type=int, default=5)
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--p", type=float, default=0.01)
+    parser.add_argument("--shots", type=int, default=100_000)
+    parser.add_argument(
+        "--decoder", choices=["matching", "majority"], default="matching"
+    )
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--cross-check", action="store_true")
+    args = parser.parse_args()
+
+    if args.cross_check:
+        check = cross_check(args.distance, args.rounds, args.p, args.shots, args.seed)
+        print(f"max |z| of detection rate differences: {check['max_z']:.2f}")
+        print(
+            "logical error rate: "
+            f"classical {check['classical_logical_error_rate']:.3e}, "
+            f"stim {check['stim_logical_error_rate']:.3e}"
+        )
+    errors = count_logical_errors(
+        args.distance, args.rounds, args.p, args.shots, args.decoder, seed=args.seed
+    )
+    print(f"logical errors: {errors}/{args.shots} = {errors / args.shots:.3e}")
@@ -1,3 +1,10 @@
+from functools import lru_cache
+from types import MappingProxyType
+
+import numpy as np
+
+import stim
+
 # ============================
 # Provided utility functions
 
@@ -62,14 +69,126 @@ def prepare_coords(distance):
     c2i = coords_to_index(datas+x_measures+z_measures)
     return datas, x_measures, z_measures, c2i
 
+# ============================
+# Cached surface code layout
+
+class SurfaceCodeLayout:
+    # Immutable qubit layout of a distance-`distance` surface code.
+    # Qubit indices are ordered: data first, then x measures, then z measures.
+    #  `data`, `x_measures` and `z_measures` hold the qubit indices of each type,
+    #  and `coords` holds the (col, row) coordinate of every qubit by index.
+    # `cx_partners[i, q]` is the qubit that qubit `q` interacts with in CX layer
+    #  `i`, or -1 if qubit `q` is idle in that layer.
+    # `cx_pairs[i]` holds the (control, target) pairs of CX layer `i` in the
+    #  order they are emitted, and `idle_qubits[i]` the qubits idle in it.
+    __slots__ = ('distance', 'data', 'x_measures', 'z_measures', 'coords',
+                 'coords_to_index', 'cx_partners', 'cx_pairs', 'idle_qubits')
+
+    def __init__(self, distance):
+        datas, x_measures, z_measures, c2i = prepare_coords(distance)
+        nd, nx = len(datas), len(x_measures)
+        n = len(c2i)
+
+        cx_partners = np.full((4, n), -1, dtype=np.int64)
+        index_reorder = [0, 2, 1, 3]
+        for i in range(4):
+            for measure in z_measures:
+                control = adjacent_coords(measure)[i]
+                if control in c2i:
+                    cx_partners[i, c2i[control]] = c2i[measure]
+                    cx_partners[i, c2i[measure]] = c2i[control]
+            for measure in x_measures:
+                target = adjacent_coords(measure)[index_reorder[i]]
+                if target in c2i:
+                    cx_partners[i, c2i[target]] = c2i[measure]
+                    cx_partners[i, c2i[measure]] = c2i[target]
+
+        # Z measures are CX targets and X measures are CX controls. Idle qubits
+        #  are the complement of the qubits busy in the layer.
+        z_indices = np.arange(nd+nx, n)
+        x_indices = np.arange(nd, nd+nx)
+        cx_pairs = []
+        idle_qubits = []
+        for partners in cx_partners:
+            zs = z_indices[partners[z_indices] >= 0]
+            xs = x_indices[partners[x_indices] >= 0]
+            pairs = np.concatenate((
+                np.stack((partners[zs], zs), axis=1),
+                np.stack((xs, partners[xs]), axis=1),
+            ))
+            idle = np.array(sorted(set(range(n)) - set(pairs.ravel().tolist())),
+                            dtype=np.int64)
+            pairs.flags.writeable = False
+            idle.flags.writeable = False
+            cx_pairs.append(pairs)
+            idle_qubits.append(idle)
+
+        fields = {
+            'distance': distance,
+            'data': np.arange(nd),
+            'x_measures': x_indices,
+            'z_measures': z_indices,
+            'coords': np.array(datas+x_measures+z_measures, dtype=np.float64),
+            'coords_to_index': MappingProxyType(c2i),
+            'cx_partners': cx_partners,
+            'cx_pairs': tuple(cx_pairs),
+            'idle_qubits': tuple(idle_qubits),
+        }
+        for name, value in fields.items():
+            if isinstance(value, np.ndarray):
+                value.flags.writeable = False
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __repr__(self):
+        return f"{type(self).__name__}(distance={self.distance})"
+
+    @property
+    def num_qubits(self):
+        return len(self.coords)
+
+    @property
+    def all_measures(self):
+        return np.concatenate((self.x_measures, self.z_measures))
+
+    @property
+    def all_qubits(self):
+        return np.arange(self.num_qubits)
+
+@lru_cache(maxsize=32)
+def layout(distance):
+    # Returns the cached `SurfaceCodeLayout` for a distance.
+    return SurfaceCodeLayout(distance)
+
+def format_coord(coord, sep=','):
+    # Returns a coordinate as a `sep`-delimited string, printing whole numbers
+    #  without a decimal point. Eg. (1.0, 2.5) is "1,2.5".
+    return sep.join(f"{c:g}" for c in coord)
+
+def join_indices(index_list):
+    # Returns a list of integer indices as a space-delimited string.
+    return ' '.join(map(str, np.asarray(index_list).tolist()))
+
+def join_lines(lines):
+    # Joins Stim instruction lines into a single circuit string.
+    return ''.join(line + '\n' for line in lines)
+
+def coord_lines(distance):
+    # Returns a QUBIT_COORDS instruction line for each qubit, based on the
+    #  coordinate-to-index mapping.
+    lay = layout(distance)
+    return [f"QUBIT_COORDS({format_coord(coord)}) {index}"
+            for index, coord in enumerate(lay.coords)]
+
 def coord_circuit(distance):
     # Returns a Stim circuit string that adds a QUBIT_COORDS instruction for each
     #  qubit, based on the coordinate-to-index mapping.
-    _, _, _, c2i = prepare_coords(distance)
-    stim_circuit = ""
-    for coord, index in c2i.items():
-        stim_circuit += f"QUBIT_COORDS({','.join(map(str, coord))}) {index}\n"
-    return stim_circuit
+    return join_lines(coord_lines(distance))
 
 def label_indices(distance):
     # Returns a Stim circuit string that labels each of the qubits with their 
@@ -79,226 +198,226 @@ def label_indices(distance):
     #  Y_ERRORs label the data qubits. 
     # The index of the qubit is encoded in the operation's error probability: 
     #  The value after the decimal is the index. Eg. 0.01 is 1 and 0.1 is 10.
-    datas, x_measures, z_measures, c2i = prepare_coords(distance)
-    all_qubits = datas + x_measures + z_measures
-    i = 0
-    stim_string = ""
-    for coord in datas:
-        stim_string += f"Y_ERROR(0.{i:>02}) {c2i[coord]}\n"
-        i += 1
-    stim_string += "TICK\n"
-    for coord in x_measures:
-        stim_string += f"X_ERROR(0.{i:>02}) {c2i[coord]}\n"
-        i += 1
-    stim_string += "TICK\n"
-    for coord in z_measures:
-        stim_string += f"Z_ERROR(0.{i:>02}) {c2i[coord]}\n"
-        i += 1
-
-    return stim_string
+    lay = layout(distance)
+    lines = [f"Y_ERROR(0.{i:>02}) {i}" for i in lay.data]
+    lines.append("TICK")
+    lines += [f"X_ERROR(0.{i:>02}) {i}" for i in lay.x_measures]
+    lines.append("TICK")
+    lines += [f"Z_ERROR(0.{i:>02}) {i}" for i in lay.z_measures]
+
+    return join_lines(lines)
 
 # ======================================================
 # hidden answer functions
+#
+# Each `*_lines` function appends Stim instruction lines to a list, so that a
+#  whole circuit is joined into a string exactly once. The `*_step` and
+#  `*_with_noise` functions return the same instructions as a string.
+
+def lattice_lines(distance, p):
+    lay = layout(distance)
+    # create the lines for just the lattice of CX gates 
+    #  required by the stabilizers, from the precomputed CX schedule.
+
+    lines = []
+    for pairs, idle_qubits in zip(lay.cx_pairs, lay.idle_qubits):
+        cx = join_indices(pairs.ravel())
+        lines += [
+            f"CX {cx}",
+            f"DEPOLARIZE2({p}) {cx}",
+            f"DEPOLARIZE1({p}) {join_indices(idle_qubits)}",
+            "TICK",
+        ]
+
+    return lines
 
 def lattice_with_noise(distance, p):
-    datas, x_measures, z_measures, c2i = prepare_coords(distance)
     # create a stim circuit string for just the lattice of CX gates 
     #  required by the stabilizers.
+    return join_lines(lattice_lines(distance, p))
+
+def stabilizers_lines(distance, p):
+    lay = layout(distance)
+    all_measures = join_indices(lay.all_measures)
+    all_qubits = join_indices(lay.all_qubits)
+    data_qubits = join_indices(lay.data)
+    x_qubits = join_indices(lay.x_measures)
+    # Use `lattice_lines` to create a full lattice of stabilizers
+    #  including the resets and measurements. No detectors yet. 
 
-    stim_string = ""
-    for i in range(4):
-        cx_qubits = []
-        for measure in z_measures:
-            z_controls = adjacent_coords(measure)
-            control = z_controls[i]
-            if control in c2i:
-                cx_qubits.extend([control, measure])
-
-        for measure in x_measures:
-            x_targets = adjacent_coords(measure)
-            index_reorder = [0, 2, 1, 3]
-            target = x_targets[index_reorder[i]]
-            if target in c2i:
-                cx_qubits.extend([measure, target]) # flipped order!
-        
-        idle_qubits = [coord for coord in c2i.keys() if coord not in cx_qubits]
-
-        stim_string += f"""
-        CX {index_string(cx_qubits, c2i)}
-        DEPOLARIZE2({p}) {index_string(cx_qubits, c2i)}
-        DEPOLARIZE1({p}) {index_string(idle_qubits, c2i)}
-        TICK
-        """
-
-    return stim_string
-
+    lines = [
+        f"R {all_measures}",
+        f"X_ERROR({p}) {all_measures}",
+        f"DEPOLARIZE1({p}) {data_qubits}",
+        "TICK",
+        f"H {x_qubits}",
+        f"DEPOLARIZE1({p}) {all_qubits}",
+        "TICK",
+    ]
+
+    lines += lattice_lines(distance, p)
+
+    lines += [
+        f"H {x_qubits}",
+        f"DEPOLARIZE1({p}) {all_qubits}",
+        "TICK",
+        f"X_ERROR({p}) {all_measures}",
+        f"DEPOLARIZE1({p}) {data_qubits}",
+        f"M {all_measures}",
+        "TICK",
+    ]
+
+    return lines
 
 def stabilizers_with_noise(distance, p):
-    datas, x_measures, z_measures, c2i = prepare_coords(distance)
-    all_measures = x_measures + z_measures
-    all_qubits = datas + all_measures
-    # Use `lattice_with_noise` to create a full lattice of stabilizers
-    #  including the resets and measurements. No detectors yet. 
-
-    stim_string = f"""
-    R {index_string(all_measures, c2i)}
-    X_ERROR({p}) {index_string(all_measures, c2i)}
-    DEPOLARIZE1({p}) {index_string(datas, c2i)}
-    TICK
-    H {index_string(x_measures,c2i)}
-    DEPOLARIZE1({p}) {index_string(all_qubits, c2i)}
-    TICK
-    """
-
-    stim_string += lattice_with_noise(distance,p)
-
-    stim_string += f"""
-    H {index_string(x_measures,c2i)}
-    DEPOLARIZE1({p}) {index_string(all_qubits, c2i)}
-    TICK
-    X_ERROR({p}) {index_string(all_measures, c2i)}
-    DEPOLARIZE1({p}) {index_string(datas, c2i)}
-    M {index_string(all_measures, c2i)}
-    TICK
-    """
-
-    return stim_string
+    return join_lines(stabilizers_lines(distance, p))
+
+def initialization_lines(distance, p):
+    lay = layout(distance)
+    all_measures = join_indices(lay.all_measures)
+    all_qubits = join_indices(lay.all_qubits)
+    data_qubits = join_indices(lay.data)
+    x_qubits = join_indices(lay.x_measures)
+    # Use `lattice_lines` to create the first round of stabilizer
+    #  measurements in the surface code. Reference but don't use 
+    #  `stabilizers_lines`. Add first-round detectors.
+
+    lines = [
+        f"R {all_qubits}",
+        f"X_ERROR({p}) {all_qubits}",
+        "TICK",
+        f"H {x_qubits}",
+        f"DEPOLARIZE1({p}) {all_qubits}",
+        "TICK",
+    ]
+
+    lines += lattice_lines(distance, p)
+
+    lines += [
+        f"H {x_qubits}",
+        f"DEPOLARIZE1({p}) {all_qubits}",
+        "TICK",
+        f"X_ERROR({p}) {all_measures}",
+        f"M {all_measures}",
+        f"DEPOLARIZE1({p}) {data_qubits}",
+        "TICK",
+    ]
+
+    z_coords = lay.coords[lay.z_measures]
+    for i in range(1, len(z_coords)+1):
+        lines.append(f"DETECTOR({format_coord(z_coords[-i], ', ')}, 0) rec[{-i}]")
+
+    return lines
 
 def initialization_step(distance, p):
-    datas, x_measures, z_measures, c2i = prepare_coords(distance)
-    all_measures = x_measures + z_measures
-    all_qubits = datas + all_measures
-    # Use `lattice_with_noise` to create the first round of stabilizer
-    #  measurements in the surface code. Reference but don't use 
-    #  `stabilizers_with_noise`. Add first-round detectors.
-    
-    stim_string = f"""
-    R {index_string(all_qubits, c2i)}
-    X_ERROR({p}) {index_string(all_qubits, c2i)}
-    TICK
-    H {index_string(x_measures,c2i)}
-    DEPOLARIZE1({p}) {index_string(all_qubits, c2i)}
-    TICK
-    """
-
-    stim_string += lattice_with_noise(distance,p)
-
-    stim_string += f"""
-    H {index_string(x_measures,c2i)}
-    DEPOLARIZE1({p}) {index_string(all_qubits, c2i)}
-    TICK
-    X_ERROR({p}) {index_string(all_measures, c2i)}
-    M {index_string(all_measures, c2i)}
-    DEPOLARIZE1({p}) {index_string(datas, c2i)}
-    TICK
-    """    
-
-    for i in range(1, len(z_measures)+1):
-        stim_string += f"""
-        DETECTOR({z_measures[-i][0]}, {z_measures[-i][1]}, 0) rec[{-i}]
-        """
-
-    return stim_string
+    return join_lines(initialization_lines(distance, p))
 
-def rounds_step(distance, rounds, p):
+def rounds_lines(distance, rounds, p):
     if rounds <= 2:
-        return "\n"
+        return []
 
-    datas, x_measures, z_measures, c2i = prepare_coords(distance)
-    # Use `stabilizers_with_noise` to implement the `REPEAT` block of
+    lay = layout(distance)
+    # Use `stabilizers_lines` to implement the `REPEAT` block of
     #  stabilizers. Include the mid-round detectors.
 
-    stim_string = f"""
-    REPEAT {rounds-2} {{
-    """
-    stim_string += stabilizers_with_noise(distance, p)
-    stim_string += f"""
-    SHIFT_COORDS(0, 0, 1)
-    """
-    
-    nmpt = len(z_measures) # num_measures_per_type
-    for i in range(1, len(z_measures)+1):
-        stim_string += f"""
-        DETECTOR({z_measures[-i][0]},{z_measures[-i][1]}, 0) rec[{-i}] rec[{-(i+2*nmpt)}]
-        """  
-    for i in range(1, len(x_measures)+1):
-        stim_string += f"""
-        DETECTOR({x_measures[-i][0]},{x_measures[-i][1]}, 0) rec[{-(i+nmpt)}] rec[{-(i+3*nmpt)}]
-        """
-    
-    stim_string += """
-    }
-    """
-
-    return stim_string
-    
-def final_step(distance, p):
-    datas, x_measures, z_measures, c2i = prepare_coords(distance)
-    all_measures = x_measures + z_measures
-    all_qubits = datas + all_measures
-    # Use `lattice_with_noise` to implement the final round of stabilizer
+    lines = [f"REPEAT {rounds-2} {{"]
+    lines += stabilizers_lines(distance, p)
+    lines.append("SHIFT_COORDS(0, 0, 1)")
+
+    z_coords = lay.coords[lay.z_measures]
+    x_coords = lay.coords[lay.x_measures]
+    nmpt = len(z_coords) # num_measures_per_type
+    for i in range(1, len(z_coords)+1):
+        lines.append(
+            f"DETECTOR({format_coord(z_coords[-i])}, 0) rec[{-i}] rec[{-(i+2*nmpt)}]"
+        )
+    for i in range(1, len(x_coords)+1):
+        lines.append(
+            f"DETECTOR({format_coord(x_coords[-i])}, 0) rec[{-(i+nmpt)}] rec[{-(i+3*nmpt)}]"
+        )
+
+    lines.append("}")
+
+    return lines
+
+def rounds_step(distance, rounds, p):
+    return join_lines(rounds_lines(distance, rounds, p)) or "\n"
+
+def final_lines(distance, p):
+    lay = layout(distance)
+    all_measures = join_indices(lay.all_measures)
+    all_qubits = join_indices(lay.all_qubits)
+    data_qubits = join_indices(lay.data)
+    x_qubits = join_indices(lay.x_measures)
+    # Use `lattice_lines` to implement the final round of stabilizer
     #  measurements and the final data measurements. Add the last round
     #  detectors, the final data measure detectors, and the 
     #  `OBSERVABLE_INCLUDE` instruction. 
-    
-    stim_string = f"""
-    R {index_string(all_measures, c2i)}
-    X_ERROR({p}) {index_string(all_measures, c2i)}
-    DEPOLARIZE1({p}) {index_string(datas, c2i)}
-    TICK
-    H {index_string(x_measures, c2i)}
-    DEPOLARIZE1({p}) {index_string(all_qubits, c2i)}
-    TICK
-    """
-
-    stim_string += lattice_with_noise(distance, p)
-
-    stim_string += f"""
-    H {index_string(x_measures, c2i)}
-    DEPOLARIZE1({p}) {index_string(all_qubits, c2i)}
-    TICK
-    X_ERROR({p}) {index_string(all_qubits, c2i)}
-    M {index_string(all_qubits, c2i)}
-    SHIFT_COORDS(0, 0, 1)
-    """
-
-    nmpt = len(z_measures) # num_measures_per_type
-    nd = len(datas) # num of datas
-    for i in range(1, len(z_measures)+1):
-        stim_string += f"""
-        DETECTOR({z_measures[-i][0]},{z_measures[-i][1]}, 0) rec[{-i}] rec[{-(i+2*nmpt+nd)}]
-        """  
-    for i in range(1, len(x_measures)+1):
-        stim_string += f"""
-        DETECTOR({x_measures[-i][0]},{x_measures[-i][1]}, 0) rec[{-(i+nmpt)}] rec[{-(i+3*nmpt+nd)}]
-        """
-
-    # create a dict that maps each coord to the record index of the most recent measurement on it
-    coord_to_record_index = {coord: i-len(all_qubits) for i, coord in enumerate(all_qubits)}
-
-    for i, measure in enumerate(z_measures):
-        record_indices = []
-        record_indices.append(coord_to_record_index[measure])
-        adjacent_datas = adjacent_coords(measure)
-        
-        coord = None
-        for data in adjacent_datas:
-            if data in all_qubits:
-                record_indices.append(coord_to_record_index[data])
-                if not coord:
-                    coord = data
 
+    lines = [
+        f"R {all_measures}",
+        f"X_ERROR({p}) {all_measures}",
+        f"DEPOLARIZE1({p}) {data_qubits}",
+        "TICK",
+        f"H {x_qubits}",
+        f"DEPOLARIZE1({p}) {all_qubits}",
+        "TICK",
+    ]
+
+    lines += lattice_lines(distance, p)
+
+    lines += [
+        f"H {x_qubits}",
+        f"DEPOLARIZE1({p}) {all_qubits}",
+        "TICK",
+        f"X_ERROR({p}) {all_qubits}",
+        f"M {all_qubits}",
+        "SHIFT_COORDS(0, 0, 1)",
+    ]
+
+    z_coords = lay.coords[lay.z_measures]
+    x_coords = lay.coords[lay.x_measures]
+    nmpt = len(z_coords) # num_measures_per_type
+    nd = len(lay.data) # num of datas
+    for i in range(1, len(z_coords)+1):
+        lines.append(
+            f"DETECTOR({format_coord(z_coords[-i])}, 0) rec[{-i}] rec[{-(i+2*nmpt+nd)}]"
+        )
+    for i in range(1, len(x_coords)+1):
+        lines.append(
+            f"DETECTOR({format_coord(x_coords[-i])}, 0) rec[{-(i+nmpt)}] rec[{-(i+3*nmpt+nd)}]"
+        )
+
+    # All qubits are measured in index order, so the record index of the most
+    #  recent measurement on qubit `q` is `q - n`. The data qubits adjacent to a
+    #  z measure are its CX partners, in plaquette corner order.
+    n = lay.num_qubits
+    for measure in lay.z_measures:
+        adjacent_datas = [q for q in lay.cx_partners[:, measure] if q >= 0]
+        record_indices = [measure-n] + [data-n for data in adjacent_datas]
         recs = [f"rec[{j}]" for j in record_indices]
-        stim_string += f"DETECTOR({coord[0]}, {coord[1]}, 0) {' '.join(recs)}\n"
-    
+        coord = lay.coords[adjacent_datas[0]]
+        lines.append(f"DETECTOR({format_coord(coord, ', ')}, 0) {' '.join(recs)}")
+
     obs_recs = [f"rec[{-(i+2*nmpt)}]" for i in range(1, distance+1)]
-    stim_string += f"OBSERVABLE_INCLUDE(0) {' '.join(obs_recs)}"
+    lines.append(f"OBSERVABLE_INCLUDE(0) {' '.join(obs_recs)}")
+
+    return lines
 
-    return stim_string
+def final_step(distance, p):
+    return join_lines(final_lines(distance, p))
+
+def surface_code_circuit_lines(distance, rounds, p):
+    # Returns the full surface code circuit as a list of Stim instruction lines.
+    lines = coord_lines(distance)
+    lines += initialization_lines(distance, p)
+    lines += rounds_lines(distance, rounds, p)
+    lines += final_lines(distance, p)
+    return lines
 
 def surface_code_circuit_string(distance, rounds, p):
-    string = coord_circuit(distance)
-    string += initialization_step(distance, p)
-    string += rounds_step(distance, rounds, p)
-    string += final_step(distance, p)
-    return string
+    return join_lines(surface_code_circuit_lines(distance, rounds, p))
+
+def surface_code_circuit(distance, rounds, p):
+    # Returns the full surface code circuit as a `stim.Circuit`.
+    return stim.Circuit(surface_code_circuit_string(distance, rounds, p))
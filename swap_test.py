@@ -1,28 +1,48 @@
 from qiskit import BasicAer, ClassicalRegister, QuantumCircuit, QuantumRegister, execute
-from qiskit.visualization import array_to_latex
 
-input1 = QuantumRegister(1, name="input1")
-input2 = QuantumRegister(1, name="input2")
-output = QuantumRegister(1, name="output")
-output_c = ClassicalRegister(1, name="outputc")
-qc = QuantumCircuit(input1, input2, output, output_c)
+from util.display import display_latex, draw_circuit
 
-qc.h(output)
-qc.cswap(output, input1, input2)
-qc.h(output)
-qc.x(output)
-qc.measure(output, output_c)
+FILENAME = "./docs/_static/swap_test.png"
 
-backend = BasicAer.get_backend("statevector_simulator")
-job = execute(qc, backend)
-result = job.result()
 
-# Draw circuit
-print(qc.draw())
+def build() -> QuantumCircuit:
+    input1 = QuantumRegister(1, name="input1")
+    input2 = QuantumRegister(1, name="input2")
+    output = QuantumRegister(1, name="output")
+    output_c = ClassicalRegister(1, name="outputc")
+    qc = QuantumCircuit(input1, input2, output, output_c)
 
-counts = result.get_counts(qc)
-print("counts:", counts)
+    qc.h(output)
+    qc.cswap(output, input1, input2)
+    qc.h(output)
+    qc.x(output)
+    qc.measure(output, output_c)
 
-# Display statevector
-ket = result.get_statevector(qc, decimals=3)
-array_to_latex(ket, prefix="\\text{Statevector} = ")
+    return qc
+
+
+def run(draw=True):
+    qc = build()
+
+    backend = BasicAer.get_backend("statevector_simulator")
+    job = execute(qc, backend)
+    result = job.result()
+
+    # Draw circuit
+    if draw:
+        print(qc.draw())
+
+    counts = result.get_counts(qc)
+    print("counts:", counts)
+
+    # Display statevector
+    if draw:
+        ket = result.get_statevector(qc, decimals=3)
+        display_latex(ket, prefix="\\text{Statevector} = ")
+        draw_circuit(qc, FILENAME)
+
+    return counts
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+from qiskit.quantum_info import Operator
+
+from util.cnf import cnf, num_ancillas, oracle_circuit, phase_diagonal
+from util.grover import validate
+
+
+@pytest.mark.parametrize("iterations", [1, 2, 3])
+@pytest.mark.parametrize("num_qubits", range(2, 8))
+def test_engine_matches_circuit(num_qubits, iterations):
+    assert validate(num_qubits, [3 % 2**num_qubits], iterations)
+
+
+def test_engine_matches_circuit_with_several_marked_states():
+    assert validate(4, [1, 6, 11], 2)
+
+
+FORMULAS = [
+    [[1, 2], [-1, 3], [-2, -3], [1, 3]],
+    [[1, -2, 3], [-1, 2], [2, 3], [-3]],
+    [[1, -1], [2, -2]],  # Only tautologies
+]
+
+
+@pytest.mark.parametrize("group_size", [None, 2])
+@pytest.mark.parametrize("formula", FORMULAS)
+def test_oracle_circuit_matches_phase_diagonal(formula, group_size):
+    # Compare the block where the scratch qubits, the most significant ones,
+    # start and end in |0⟩
+    formula = cnf(formula)
+    qc = oracle_circuit(formula, group_size)
+    size = 2**formula.num_variables
+    assert num_ancillas(formula, group_size) == qc.num_qubits - formula.num_variables
+    block = Operator(qc).data[:size, :size]
+    assert np.allclose(block, np.diag(phase_diagonal(formula)))
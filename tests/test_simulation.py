@@ -0,0 +1,53 @@
+import math
+
+import numpy as np
+from qiskit import QuantumCircuit
+from qiskit.circuit import Parameter
+from qiskit.circuit.library import QFT
+from qiskit.quantum_info import Statevector
+
+from util.simulation import circuit_fingerprint, simulate_statevector
+
+
+def test_fingerprint_includes_global_phase():
+    qc = QuantumCircuit(1)
+    qc.h(0)
+    shifted = qc.copy()
+    shifted.global_phase = math.pi
+    assert circuit_fingerprint(qc) != circuit_fingerprint(shifted)
+
+    theta = Parameter("theta")
+    parameterized = qc.copy()
+    parameterized.global_phase = theta / 2
+    assert circuit_fingerprint(parameterized) != circuit_fingerprint(qc)
+
+
+def test_fingerprint_includes_definition_global_phase():
+    inner = QuantumCircuit(1)
+    inner.h(0)
+    shifted = inner.copy()
+    shifted.global_phase = 1.0
+    circuits = []
+    for definition in (inner, shifted):
+        qc = QuantumCircuit(1)
+        qc.append(definition.to_gate(label="G"), [0])
+        circuits.append(qc)
+    assert circuit_fingerprint(circuits[0]) != circuit_fingerprint(circuits[1])
+
+
+def test_simulate_statevector_respects_global_phase():
+    qc = QuantumCircuit(1)
+    qc.h(0)
+    simulate_statevector(qc)
+    shifted = qc.copy()
+    shifted.global_phase = math.pi
+    assert np.allclose(simulate_statevector(shifted).data, Statevector(shifted).data)
+
+
+def test_simulate_statevector_matches_qft():
+    qc = QuantumCircuit(4)
+    qc.h(range(4))
+    qc.p(0.3, 1)
+    qc.append(QFT(3, inverse=True).to_gate(), [0, 2, 3])
+    qc.global_phase = 0.2
+    assert np.allclose(simulate_statevector(qc).data, Statevector(qc).data)
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+from qiskit import QuantumCircuit
+from qiskit.quantum_info import Statevector
+
+from util.statevector import IncrementalStatevector
+
+
+def test_update_follows_circuit():
+    qc = QuantumCircuit(3)
+    sim = IncrementalStatevector(qc)
+    for q in range(3):
+        qc.h(q)
+        qc.cx(q, (q + 1) % 3)
+        assert np.allclose(sim.update().data, Statevector(qc).data)
+
+
+def test_update_applies_global_phase_once():
+    qc = QuantumCircuit(1)
+    qc.h(0)
+    qc.global_phase = 0.5
+    sim = IncrementalStatevector(qc)
+    sim.update()
+    qc.x(0)
+    assert np.allclose(sim.update().data, Statevector(qc).data)
+    qc.global_phase = 1.5
+    assert np.allclose(sim.update().data, Statevector(qc).data)
+
+
+def test_rollback_restores_state_and_circuit():
+    qc = QuantumCircuit(2)
+    sim = IncrementalStatevector(qc)
+    qc.h(0)
+    sim.snapshot("a")
+    expected = Statevector(qc)
+    qc.cx(0, 1)
+    sim.snapshot("b")
+    qc.x(1)
+
+    assert np.allclose(sim.rollback("a").data, expected.data)
+    assert len(qc.data) == 1
+    # Snapshots taken after the restored one are discarded
+    with pytest.raises(KeyError):
+        sim.rollback("b")
+
+    qc.ry(0.3, 1)
+    assert np.allclose(sim.update().data, Statevector(qc).data)
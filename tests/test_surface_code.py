@@ -0,0 +1,20 @@
+from pathlib import Path
+
+import pytest
+
+import stim
+from util.qec import circuit_string
+
+# Reference circuits emitted by the original, line-by-line implementation of
+# `surface_code_circuit_string`, with p = 0.001.
+DATA = Path(__file__).parent / "data"
+
+
+@pytest.mark.parametrize("rounds", [1, 2, 3])
+@pytest.mark.parametrize("distance", [3, 5])
+def test_surface_code_circuit_unchanged(distance, rounds):
+    reference = stim.Circuit.from_file(
+        DATA / f"surface_code_d{distance}_r{rounds}.stim"
+    )
+    circuit = stim.Circuit(circuit_string("surface_code", distance, rounds, 0.001))
+    assert circuit == reference
@@ -0,0 +1,36 @@
+from qiskit import QuantumCircuit, transpile
+from qiskit.circuit import Parameter
+from qiskit.providers.fake_provider import GenericBackendV2
+
+from util.transpilation import TranspileCache
+
+
+def test_hit_uses_callers_parameters(tmp_path):
+    cache = TranspileCache(tmp_path)
+    backend = GenericBackendV2(num_qubits=3, seed=1)
+    results = []
+    for theta in (Parameter("theta"), Parameter("theta")):
+        qc = QuantumCircuit(2)
+        qc.rx(theta, 0)
+        qc.cx(0, 1)
+        results.append((theta, cache.transpile(qc, backend, seed_transpiler=0)))
+    assert cache.hits == 1
+    theta, result = results[1]
+    assert result.assign_parameters({theta: 0.3}).num_parameters == 0
+
+
+def test_key_covers_global_phase_and_backend(tmp_path):
+    cache = TranspileCache(tmp_path)
+    backend = GenericBackendV2(num_qubits=3, seed=1)
+    qc = QuantumCircuit(1)
+    qc.h(0)
+    cache.transpile(qc, backend, seed_transpiler=0)
+
+    qc.global_phase = 1.0
+    result = cache.transpile(qc, backend, seed_transpiler=0)
+    assert cache.hits == 0
+    assert result.global_phase == transpile(qc, backend, seed_transpiler=0).global_phase
+
+    # Another seed gives other error rates
+    cache.transpile(qc, GenericBackendV2(num_qubits=3, seed=2), seed_transpiler=0)
+    assert cache.hits == 0
@@ -1,22 +1,47 @@
-from qiskit import QuantumCircuit, transpile
+from qiskit import QuantumCircuit
 from qiskit.providers.fake_provider import GenericBackendV2
 
-qc = QuantumCircuit(3)
-qc.y(0)
-for t in range(2):
-    qc.cx(0, t + 1)
-
-print(qc.draw())
-
-backend = GenericBackendV2(num_qubits=3)
-t_qc = transpile(qc, backend, optimization_level=1)
-
-# Draw the circuit
-t_qc.draw(
-    output="mpl",
-    style="iqp",
-    cregbundle=False,
-    initial_state=True,
-    fold=-1,
-    filename="./docs/_static/transpile.png",
-)
+from util.display import draw_circuit
+from util.transpilation import cached_transpile
+
+FILENAME = "./docs/_static/transpile.png"
+
+seed = 0  # Seeds the backend and the transpiler, so that the diagram is reproducible
+
+
+def build(num_qubits=3) -> QuantumCircuit:
+    qc = QuantumCircuit(num_qubits)
+    qc.y(0)
+    for t in range(num_qubits - 1):
+        qc.cx(0, t + 1)
+
+    return qc
+
+
+# Transpile, reusing the result cached on disk by an earlier run
+def transpiled(qc) -> QuantumCircuit:
+    backend = GenericBackendV2(num_qubits=qc.num_qubits, seed=seed)
+    return cached_transpile(qc, backend, optimization_level=1, seed_transpiler=seed)
+
+
+def diagram(qc) -> QuantumCircuit:
+    return transpiled(qc)
+
+
+def run(draw=True):
+    qc = build()
+
+    if draw:
+        print(qc.draw())
+
+    t_qc = transpiled(qc)
+
+    # Draw the circuit
+    if draw:
+        draw_circuit(t_qc, FILENAME)
+
+    return t_qc
+
+
+if __name__ == "__main__":
+    run()
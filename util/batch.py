@@ -0,0 +1,151 @@
+from typing import Mapping
+
+import numpy as np
+from qiskit import QuantumCircuit
+from qiskit.circuit import ParameterExpression
+from qiskit.quantum_info import Operator
+
+from util.simulation import simulation_hook
+
+# Simulation of one parameterized circuit for a whole batch of parameter
+# values at once. The states are held as a (batch, 2^n) array, and each gate
+# is applied once to all rows, with one matrix per row for the parameterized
+# gates. Operations recognized by `simulation_hooks`, such as the QFT, are
+# applied to all rows by the hook.
+
+
+def _rotation_matrices(name, theta):
+    # Matrices of shape (batch, 2, 2) of the rotation gates for angles `theta`.
+    c, s = np.cos(theta / 2), np.sin(theta / 2)
+    one, zero = np.ones_like(theta), np.zeros_like(theta)
+    if name == "rz":
+        rows = [[np.exp(-0.5j * theta), zero], [zero, np.exp(0.5j * theta)]]
+    elif name == "p":
+        rows = [[one, zero], [zero, np.exp(1j * theta)]]
+    elif name == "rx":
+        rows = [[c, -1j * s], [-1j * s, c]]
+    elif name == "ry":
+        rows = [[c, -s], [s, c]]
+    else:
+        return None
+    return np.moveaxis(np.array(rows, dtype=complex), -1, 0)
+
+
+def _apply_matrix(states, matrix, qubits):
+    # Apply a matrix of shape (2^k, 2^k), or (batch, 2^k, 2^k) for one matrix
+    # per row, on `qubits`, where `qubits[0]` is the least significant bit.
+    batch, size = states.shape
+    num_qubits = size.bit_length() - 1
+    k = len(qubits)
+    if k == 1:
+        # View the qubit as the middle axis of (batch, high, 2, low) instead of
+        # moving axes around.
+        tensor = states.reshape(batch, -1, 2, 1 << qubits[0])
+        m = matrix.reshape(-1, 1, 2, 2)
+        a0, a1 = tensor[:, :, 0], tensor[:, :, 1]
+        if not (np.any(m[..., 0, 1]) or np.any(m[..., 1, 0])):
+            a0 *= m[:, :, 0, :1]
+            a1 *= m[:, :, 1, 1:]
+            return states
+        out = np.empty_like(tensor)
+        out[:, :, 0] = m[:, :, 0, :1] * a0 + m[:, :, 0, 1:] * a1
+        out[:, :, 1] = m[:, :, 1, :1] * a0 + m[:, :, 1, 1:] * a1
+        return out.reshape(batch, size)
+    source = [1 + num_qubits - 1 - q for q in reversed(qubits)]
+    destination = [*range(1 + num_qubits - k, 1 + num_qubits)]
+    tensor = states.reshape((batch,) + (2,) * num_qubits)
+    tensor = np.moveaxis(tensor, source, destination).reshape(batch, -1, 2**k)
+    subscripts = "bij,brj->bri" if matrix.ndim == 3 else "ij,brj->bri"
+    tensor = np.einsum(subscripts, matrix, tensor)
+    tensor = tensor.reshape((batch,) + (2,) * num_qubits)
+    return np.moveaxis(tensor, destination, source).reshape(batch, size)
+
+
+def _parameter_table(qc, values):
+    # Map each parameter of the circuit to its (batch,) array of values, given
+    # a mapping or a (batch, num_parameters) array in `qc.parameters` order.
+    if isinstance(values, Mapping):
+        table = {p: np.asarray(values[p], dtype=float) for p in qc.parameters}
+    else:
+        values = np.asarray(values, dtype=float)
+        if values.ndim == 1:
+            values = values[:, None]
+        if values.shape[1] != qc.num_parameters:
+            raise ValueError(
+                f"Expected {qc.num_parameters} parameter values per row, "
+                f"got {values.shape[1]}."
+            )
+        table = dict(zip(qc.parameters, values.T))
+    sizes = {len(v) for v in table.values()}
+    if len(sizes) > 1:
+        raise ValueError("All parameters must have the same number of values.")
+    return table, sizes.pop() if sizes else 1
+
+
+def _evaluate(param, table, batch):
+    # Values of a gate parameter for every row of the batch.
+    if not isinstance(param, ParameterExpression):
+        return np.full(batch, float(param))
+    if param in table:
+        return table[param]
+    import sympy
+
+    parameters = sorted(param.parameters, key=lambda p: p.name)
+    function = sympy.lambdify(
+        [sympy.Symbol(p.name) for p in parameters], param.sympify(), "numpy"
+    )
+    return np.broadcast_to(
+        np.real(function(*(table[p] for p in parameters))), (batch,)
+    ).astype(float)
+
+
+def _bind(operation, values):
+    gate = operation.copy()
+    gate.params = [float(v) for v in values]
+    return gate
+
+
+def batch_statevectors(qc: QuantumCircuit, values) -> np.ndarray:
+    # Get the (batch, 2^n) statevectors of the circuit for each row of
+    # parameter values, starting from |0⟩.
+    table, batch = _parameter_table(qc, values)
+    qubits = {bit: i for i, bit in enumerate(qc.qubits)}
+    states = np.zeros((batch, 2**qc.num_qubits), dtype=complex)
+    states[:, 0] = 1
+
+    for instruction in qc.data:
+        operation = instruction.operation
+        targets = [qubits[q] for q in instruction.qubits]
+        if operation.name == "barrier":
+            continue
+        apply = simulation_hook(operation)
+        if apply is not None:
+            states = apply(states, targets)
+            continue
+        if not any(isinstance(p, ParameterExpression) for p in operation.params):
+            states = _apply_matrix(states, Operator(operation).data, targets)
+            continue
+
+        params = [_evaluate(p, table, batch) for p in operation.params]
+        matrices = None
+        if len(params) == 1:
+            matrices = _rotation_matrices(operation.name, params[0])
+        if matrices is None:
+            # Bind the other parameterized gates once per distinct set of values.
+            rows, inverse = np.unique(
+                np.stack(params, axis=1), axis=0, return_inverse=True
+            )
+            unique = np.array([Operator(_bind(operation, row)).data for row in rows])
+            matrices = unique[inverse.reshape(-1)]
+        states = _apply_matrix(states, matrices, targets)
+
+    if qc.global_phase:
+        phase = _evaluate(qc.global_phase, table, batch)
+        states *= np.exp(1j * phase)[:, None]
+    return states
+
+
+def batch_probabilities(qc: QuantumCircuit, values) -> np.ndarray:
+    # Get the (batch, 2^n) measurement probabilities of the circuit for each
+    # row of parameter values.
+    return np.abs(batch_statevectors(qc, values)) ** 2
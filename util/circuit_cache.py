@@ -0,0 +1,211 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, Tuple, Union
+
+import numpy as np
+import pymatching
+import scipy.sparse
+
+import stim
+
+# Each cache under the root has its own folder, since `CircuitCache` treats
+# every folder in its directory as one of its entries.
+DEFAULT_CACHE_DIR = (
+    Path(os.environ.get("QUANTUM_CACHE_DIR", Path.home() / ".cache" / "quantum"))
+    / "circuits"
+)
+CIRCUIT_FILE = "circuit.stim"
+DEM_FILE = "model.dem"
+GRAPH_FILE = "graph.npz"
+
+
+@dataclass
+class CachedCircuit:
+    key: str
+    circuit: stim.Circuit
+    dem: stim.DetectorErrorModel
+    matching: pymatching.Matching
+
+
+def circuit_key(circuit_text: str, noise=None) -> str:
+    # Content address of a circuit: the SHA-256 of its text and of the noise
+    # parameters it was generated with.
+    if isinstance(noise, dict):
+        noise = {k: np.asarray(v).tolist() for k, v in sorted(noise.items())}
+    payload = json.dumps([circuit_text, noise], sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _save_graph(matching: pymatching.Matching, path: Path):
+    # Saves the matching graph as edge arrays, with -1 for the boundary node.
+    edges = matching.edges()
+    fault_ids = [sorted(data["fault_ids"]) for *_, data in edges]
+    np.savez(
+        path,
+        num_detectors=matching.num_detectors,
+        num_fault_ids=matching.num_fault_ids,
+        u=np.array([u for u, _, _ in edges], dtype=np.int64),
+        v=np.array([-1 if v is None else v for _, v, _ in edges], dtype=np.int64),
+        weights=np.array([data["weight"] for *_, data in edges]),
+        error_probabilities=np.array([data["error_probability"] for *_, data in edges]),
+        fault_rows=np.array([f for ids in fault_ids for f in ids], dtype=np.int64),
+        fault_cols=np.array(
+            [j for j, ids in enumerate(fault_ids) for _ in ids], dtype=np.int64
+        ),
+    )
+
+
+def _load_graph(path: Path) -> pymatching.Matching:
+    # Rebuilds the matching graph from its check matrix, where each column is
+    # an edge and boundary edges have a single detector.
+    graph = np.load(path)
+    u, v = graph["u"], graph["v"]
+    num_edges = len(u)
+    internal = v >= 0
+    rows = np.concatenate((u, v[internal]))
+    cols = np.concatenate((np.arange(num_edges), np.arange(num_edges)[internal]))
+    check_matrix = scipy.sparse.csc_matrix(
+        (np.ones(len(rows), dtype=np.uint8), (rows, cols)),
+        shape=(int(graph["num_detectors"]), num_edges),
+    )
+    faults_matrix = scipy.sparse.csc_matrix(
+        (
+            np.ones(len(graph["fault_rows"]), dtype=np.uint8),
+            (graph["fault_rows"], graph["fault_cols"]),
+        ),
+        shape=(int(graph["num_fault_ids"]), num_edges),
+    )
+    return pymatching.Matching.from_check_matrix(
+        check_matrix,
+        weights=graph["weights"],
+        error_probabilities=graph["error_probabilities"],
+        faults_matrix=faults_matrix,
+        use_virtual_boundary_node=True,
+    )
+
+
+def _read_circuit(circuit):
+    # Reads a `.stim` file given as a path, leaving circuit text as it is.
+    if isinstance(circuit, str) and "\n" not in circuit and circuit.endswith(".stim"):
+        circuit = Path(circuit)
+    if isinstance(circuit, Path):
+        circuit = circuit.read_text()
+    return circuit
+
+
+def compile_circuit(
+    circuit: Union[str, Path, stim.Circuit], noise=None
+) -> CachedCircuit:
+    # Parses the circuit and builds its detector error model and matching
+    # graph, without touching the disk.
+    circuit = _read_circuit(circuit)
+    text = str(circuit)
+    if not isinstance(circuit, stim.Circuit):
+        circuit = stim.Circuit(text)
+    dem = circuit.detector_error_model(decompose_errors=True)
+    matching = pymatching.Matching.from_detector_error_model(dem)
+    return CachedCircuit(circuit_key(text, noise), circuit, dem, matching)
+
+
+class CircuitCache:
+    # On-disk cache of parsed circuits, their detector error models and their
+    # matching graphs, keyed by `circuit_key`. Each entry is a folder, whose
+    # modification time is refreshed on every hit. The least recently used
+    # entries are evicted once the cache grows past `max_bytes`.
+
+    def __init__(
+        self,
+        directory: Union[str, Path] = DEFAULT_CACHE_DIR,
+        max_bytes: int = 1 << 30,
+    ):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def load(
+        self, circuit: Union[str, Path, stim.Circuit], noise=None
+    ) -> CachedCircuit:
+        # Returns the cached entry of a circuit given as text, a `.stim` file
+        # path or a `stim.Circuit`, building and storing it on a miss.
+        circuit = _read_circuit(circuit)
+        text = str(circuit)
+        key = circuit_key(text, noise)
+        entry = self.directory / key
+        if entry.is_dir():
+            self.hits += 1
+            os.utime(entry)
+            return CachedCircuit(
+                key,
+                stim.Circuit.from_file(entry / CIRCUIT_FILE),
+                stim.DetectorErrorModel.from_file(entry / DEM_FILE),
+                _load_graph(entry / GRAPH_FILE),
+            )
+
+        self.misses += 1
+        cached = compile_circuit(circuit, noise)
+        self._store(entry, cached.circuit, cached.dem, cached.matching)
+        return cached
+
+    def _store(self, entry: Path, circuit, dem, matching):
+        # Writes the entry into a temporary folder first, so that concurrent
+        # readers never see a partial entry.
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp = Path(tempfile.mkdtemp(dir=self.directory, prefix=".tmp-"))
+        try:
+            circuit.to_file(tmp / CIRCUIT_FILE)
+            dem.to_file(tmp / DEM_FILE)
+            _save_graph(matching, tmp / GRAPH_FILE)
+            os.replace(tmp, entry)
+        except OSError:
+            # Another process stored the same entry first.
+            shutil.rmtree(tmp, ignore_errors=True)
+        self.evict()
+
+    def _entries(self):
+        if not self.directory.is_dir():
+            return []
+        return [
+            e
+            for e in self.directory.iterdir()
+            if e.is_dir() and not e.name.startswith(".")
+        ]
+
+    @staticmethod
+    def _entry_stat(entry: Path) -> Optional[Tuple[float, int]]:
+        # Modification time and size of an entry, or None if another process
+        # removed it in the meantime.
+        try:
+            mtime = entry.stat().st_mtime
+            return mtime, sum(f.stat().st_size for f in entry.iterdir())
+        except FileNotFoundError:
+            return None
+
+    def _stats(self):
+        stats = ((e, self._entry_stat(e)) for e in self._entries())
+        return [(e, stat) for e, stat in stats if stat is not None]
+
+    @property
+    def size(self) -> int:
+        return sum(size for _, (_, size) in self._stats())
+
+    def evict(self, max_bytes: Optional[int] = None):
+        # Removes the least recently used entries until the cache fits in
+        # `max_bytes`. Entries removed concurrently by other processes are
+        # skipped.
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        stats = sorted(self._stats(), key=lambda item: item[1][0])
+        total = sum(size for _, (_, size) in stats)
+        for entry, (_, size) in stats:
+            if total <= max_bytes:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+
+    def clear(self):
+        self.evict(max_bytes=0)
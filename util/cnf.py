@@ -0,0 +1,208 @@
+import math
+from dataclasses import dataclass
+from typing import Optional, Sequence, Tuple, Union
+
+import numpy as np
+from qiskit import QuantumCircuit, QuantumRegister
+from qiskit.circuit.library import MCMT, OR
+from qiskit.circuit.library.standard_gates import CZGate
+
+# Boolean formulas in conjunctive normal form, with clauses as in DIMACS: each
+# clause is a list of non-zero literals, where `v` is variable v and `-v` is
+# NOT v, for variables numbered from 1. Variable v is qubit v-1, so basis
+# state i assigns bit v-1 of i to variable v.
+
+CHUNK_SIZE = 1 << 20
+
+
+@dataclass(frozen=True)
+class CNF:
+    num_variables: int
+    clauses: Tuple[Tuple[int, ...], ...]
+
+
+def parse_dimacs(text: str) -> CNF:
+    # Parse a DIMACS CNF file. Clauses end with 0 and may span lines.
+    num_variables = None
+    clauses, clause = [], []
+    for line in text.splitlines():
+        line = line.strip()
+        if line.startswith("%"):
+            break
+        if not line or line.startswith("c"):
+            continue
+        if line.startswith("p"):
+            fields = line.split()
+            if len(fields) != 4 or fields[1] != "cnf":
+                raise ValueError(f"Invalid DIMACS header {line!r}.")
+            num_variables = int(fields[2])
+            continue
+        for literal in map(int, line.split()):
+            if literal == 0:
+                clauses.append(clause)
+                clause = []
+            else:
+                clause.append(literal)
+    if clause:
+        clauses.append(clause)
+    return cnf(clauses, num_variables)
+
+
+def cnf(
+    formula: Union[CNF, str, Sequence[Sequence[int]]],
+    num_variables: Optional[int] = None,
+) -> CNF:
+    # Normalize DIMACS text or a list of clauses. Repeated literals are merged
+    # and clauses that contain both a literal and its negation are dropped.
+    if isinstance(formula, CNF):
+        return formula
+    if isinstance(formula, str):
+        return parse_dimacs(formula)
+
+    clauses = []
+    for clause in formula:
+        literals = sorted(set(clause), key=abs)
+        if not literals or 0 in literals:
+            raise ValueError(f"Invalid clause {list(clause)}.")
+        if len({abs(x) for x in literals}) < len(literals):
+            continue
+        clauses.append(tuple(literals))
+    largest = max((abs(x) for clause in clauses for x in clause), default=0)
+    if num_variables is None:
+        num_variables = largest
+    elif largest > num_variables:
+        raise ValueError(f"Variable {largest} exceeds {num_variables} variables.")
+    return CNF(num_variables, tuple(clauses))
+
+
+def num_ancillas(formula, group_size: Optional[int] = None) -> int:
+    # Number of scratch qubits used by `oracle_circuit`.
+    formula = cnf(formula)
+    num_clauses = len(formula.clauses)
+    if group_size is None or group_size >= num_clauses:
+        return num_clauses
+    return group_size + math.ceil(num_clauses / group_size)
+
+
+def _clause_gate(clause):
+    flags = [1 if x > 0 else -1 for x in clause]
+    return OR(
+        num_variable_qubits=len(clause), flags=flags, mcx_mode="noancilla"
+    ).to_gate(label="OR")
+
+
+def _phase_and(qc, qubits):
+    # Flip the phase when all `qubits` are 1.
+    if len(qubits) == 1:
+        qc.z(qubits[0])
+        return
+    mtcz = MCMT(gate=CZGate(), num_ctrl_qubits=len(qubits) - 1, num_target_qubits=1)
+    qc.compose(mtcz, qubits=qubits, inplace=True)
+
+
+def _strip_barrier(qc):
+    # Drop the barrier after the last gate, leaving it to the caller.
+    if qc.data and qc.data[-1].operation.name == "barrier":
+        qc.data.pop()
+    return qc
+
+
+def oracle_circuit(
+    formula, group_size: Optional[int] = None, barriers: bool = True
+) -> QuantumCircuit:
+    # Phase oracle that flips the relative phases of all assignments satisfying
+    # the formula. Each clause is computed into a scratch qubit by an `OR` gate.
+    # By default every clause has its own scratch qubit, and the phase is set
+    # by a multi-controlled Z over all of them. With `group_size`, clauses are
+    # computed `group_size` at a time into reused scratch qubits, whose AND is
+    # stored in one qubit per group, trading depth for ancillas.
+    formula = cnf(formula)
+    clauses = formula.clauses
+    variables = QuantumRegister(formula.num_variables, name="x")
+    scratch = QuantumRegister(num_ancillas(formula, group_size), name="scratch")
+    qc = QuantumCircuit(variables, scratch)
+    if not clauses:
+        # Every assignment satisfies an empty formula, such as one whose
+        # clauses were all tautologies, so the oracle is a global phase of -1.
+        qc.global_phase = math.pi
+        return qc
+    gates = [_clause_gate(clause) for clause in clauses]
+
+    def barrier():
+        if barriers:
+            qc.barrier()
+
+    def compute(indices, slots, inverse=False):
+        order = reversed(range(len(indices))) if inverse else range(len(indices))
+        for k in order:
+            clause = clauses[indices[k]]
+            gate = gates[indices[k]].inverse() if inverse else gates[indices[k]]
+            qargs = [variables[abs(x) - 1] for x in clause] + [slots[k]]
+            qc.append(gate, qargs=qargs)
+            barrier()
+
+    if group_size is None or group_size >= len(clauses):
+        indices = range(len(clauses))
+        compute(indices, scratch)
+        _phase_and(qc, scratch[:])
+        barrier()
+        compute(indices, scratch, inverse=True)
+        return _strip_barrier(qc)
+
+    groups = [
+        range(start, min(start + group_size, len(clauses)))
+        for start in range(0, len(clauses), group_size)
+    ]
+    slots, results = scratch[:group_size], scratch[group_size:]
+
+    def compute_group(j):
+        compute(groups[j], slots)
+        qc.mcx(slots[: len(groups[j])], results[j])
+        barrier()
+        compute(groups[j], slots, inverse=True)
+
+    for j in range(len(groups)):
+        compute_group(j)
+    _phase_and(qc, results)
+    barrier()
+    for j in reversed(range(len(groups))):
+        compute_group(j)
+    return _strip_barrier(qc)
+
+
+def evaluate(formula) -> np.ndarray:
+    # Evaluate the formula over all 2^n assignments, as a boolean vector
+    # indexed by basis state, one chunk of `CHUNK_SIZE` indices at a time. The
+    # low bits of the indices repeat the same pattern in every chunk, so their
+    # vectors are built once, and the high bits are constant within a chunk,
+    # so literals on them satisfy or drop out of a clause as a whole. Memory
+    # beyond the result stays bounded by the chunk size.
+    formula = cnf(formula)
+    n = formula.num_variables
+    size = min(CHUNK_SIZE, 2**n)
+    low = size.bit_length() - 1  # Variables 1..low vary within a chunk
+    offsets = np.arange(size)
+    bits = {v: (offsets >> (v - 1)) & 1 == 1 for v in range(1, low + 1)}
+
+    satisfied = np.ones(2**n, dtype=bool)
+    clause_value = np.empty(size, dtype=bool)
+    for start in range(0, 2**n, size):
+        chunk = satisfied[start : start + size]
+        for clause in formula.clauses:
+            if any(
+                abs(x) > low and (start >> (abs(x) - 1) & 1) == (x > 0) for x in clause
+            ):
+                continue
+            clause_value[:] = False
+            for x in clause:
+                if x > 0 and x <= low:
+                    clause_value |= bits[x]
+                elif x < 0 and -x <= low:
+                    clause_value |= ~bits[-x]
+            chunk &= clause_value
+    return satisfied
+
+
+def phase_diagonal(formula) -> np.ndarray:
+    # Diagonal of the phase oracle: -1 for satisfying assignments, 1 otherwise.
+    return np.where(evaluate(formula), -1.0, 1.0)
@@ -0,0 +1,97 @@
+from collections import OrderedDict
+
+import numpy as np
+import pymatching
+
+import stim
+
+
+class CachedDecoder:
+    # Matching decoder behind an LRU cache of syndromes. Each batch is reduced
+    # to its unique bit-packed detector rows, and only the rows missing from
+    # the cache are decoded. At low error rates most syndromes are empty or
+    # repeat exactly, so most shots never reach the decoder. A `max_size` of 0
+    # disables the cache.
+
+    def __init__(
+        self, matching: pymatching.Matching, num_detectors: int, max_size=1_000_000
+    ):
+        self.matching = matching
+        self.num_detectors = num_detectors
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()
+
+    @classmethod
+    def from_circuit(cls, circuit: stim.Circuit, max_size=1_000_000):
+        matching = pymatching.Matching.from_detector_error_model(
+            circuit.detector_error_model(decompose_errors=True)
+        )
+        return cls(matching, circuit.num_detectors, max_size=max_size)
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def __len__(self):
+        return len(self._cache)
+
+    def clear(self):
+        self._cache.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def decode_batch(
+        self, detection_events: np.ndarray, bit_packed: bool = False
+    ) -> np.ndarray:
+        # Returns the predicted observable flips of each shot as a boolean
+        # array of shape (shots, num_observables). `detection_events` are
+        # boolean rows, or bit-packed rows as sampled with `bit_packed=True`.
+        if not bit_packed:
+            detection_events = np.packbits(detection_events, axis=1, bitorder="little")
+        if not len(detection_events):
+            return np.zeros((0, self.matching.num_fault_ids), dtype=bool)
+        if not self.max_size:
+            self.misses += len(detection_events)
+            return self.matching.decode_batch(
+                detection_events, bit_packed_shots=True
+            ).astype(bool)
+        # View each packed row as a single opaque item, so that finding the
+        # unique rows is a 1-D sort rather than a row-wise lexsort.
+        detection_events = np.ascontiguousarray(detection_events, dtype=np.uint8)
+        rows = detection_events.view(
+            np.dtype((np.void, detection_events.shape[1]))
+        ).reshape(-1)
+        unique_rows, index, inverse = np.unique(
+            rows, return_index=True, return_inverse=True
+        )
+        syndromes = detection_events[index]
+
+        keys = [row.tobytes() for row in unique_rows]
+        predictions = [None] * len(keys)
+        missing = []
+        for i, key in enumerate(keys):
+            prediction = self._cache.get(key)
+            if prediction is None:
+                missing.append(i)
+            else:
+                self._cache.move_to_end(key)
+                predictions[i] = prediction
+
+        if missing:
+            decoded = self.matching.decode_batch(
+                syndromes[missing], bit_packed_shots=True
+            ).astype(bool)
+            for i, prediction in zip(missing, decoded):
+                predictions[i] = prediction
+                self._cache[keys[i]] = prediction
+            while len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+
+        # Every shot counts as a hit except the first occurrence of each
+        # syndrome that had to be decoded.
+        self.misses += len(missing)
+        self.hits += len(inverse) - len(missing)
+        return np.array(predictions)[inverse]
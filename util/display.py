@@ -0,0 +1,22 @@
+# Rendering helpers. IPython, the LaTeX renderer and matplotlib are imported
+# only when something is rendered, so that importing and running the examples
+# without drawing stays fast.
+
+
+def display_latex(array, **kwargs):
+    from IPython.display import display
+    from qiskit.visualization import array_to_latex
+
+    display(array_to_latex(array, **kwargs))
+
+
+def draw_circuit(qc, filename):
+    # Draw the circuit in the style of the diagrams in `docs/_static`.
+    qc.draw(
+        output="mpl",
+        style="iqp",
+        cregbundle=False,
+        initial_state=True,
+        fold=-1,
+        filename=filename,
+    )
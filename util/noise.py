@@ -0,0 +1,104 @@
+from functools import lru_cache
+from typing import List, Mapping, Tuple, Union
+
+import numpy as np
+
+import stim
+from util.qec import circuit_string
+
+# Noise channels whose probability is swapped by `apply_noise`.
+NOISE_GATES = ("DEPOLARIZE1", "DEPOLARIZE2", "X_ERROR")
+
+# Either a single probability for every noise channel, or a probability per
+# noise gate type. A per-gate-type value may be an array indexed by qubit, for
+# example from calibration data. A two-qubit channel takes the larger of its
+# two qubits' probabilities. Gate types missing from a mapping get zero noise.
+Noise = Union[float, Mapping[str, Union[float, np.ndarray]]]
+
+
+class CircuitStructure:
+    # Noiseless structure of a Stim circuit. The circuit text is split into
+    # `chunks` around its noise instructions, which are kept as `slots` of
+    # (gate, targets) so their probabilities can be filled in later.
+
+    def __init__(self, circuit: stim.Circuit):
+        self.num_qubits = circuit.num_qubits
+        self.chunks: List[str] = []
+        self.slots: List[Tuple[str, np.ndarray]] = []
+        text: List[str] = []
+        self._split(circuit, text)
+        self.chunks.append("".join(text))
+        # Template for a single probability per gate type, filled with `%`.
+        self._template = (
+            "".join(
+                chunk + f"{gate}(%({gate})s) {' '.join(map(str, targets.tolist()))}\n"
+                for chunk, (gate, targets) in zip(self.chunks, self.slots)
+            )
+            + self.chunks[-1]
+        )
+
+    def _split(self, circuit: stim.Circuit, text: List[str]):
+        for instruction in circuit:
+            if isinstance(instruction, stim.CircuitRepeatBlock):
+                text.append(f"REPEAT {instruction.repeat_count} {{\n")
+                self._split(instruction.body_copy(), text)
+                text.append("}\n")
+            elif instruction.name in NOISE_GATES:
+                self.chunks.append("".join(text))
+                text.clear()
+                targets = [t.value for t in instruction.targets_copy()]
+                self.slots.append((instruction.name, np.array(targets)))
+            else:
+                text.append(f"{instruction}\n")
+
+    def _slot_lines(self, gate: str, targets: np.ndarray, p) -> str:
+        if np.ndim(p) == 0:
+            return f"{gate}({float(p)}) {' '.join(map(str, targets.tolist()))}\n"
+        if gate == "DEPOLARIZE2":
+            pairs = targets.reshape(-1, 2)
+            probs = np.maximum(p[pairs[:, 0]], p[pairs[:, 1]])
+            groups = pairs
+        else:
+            probs = p[targets]
+            groups = targets[:, None]
+        lines = []
+        for prob in np.unique(probs):
+            group = groups[probs == prob].ravel()
+            lines.append(
+                f"{gate}({float(prob)}) {' '.join(map(str, group.tolist()))}\n"
+            )
+        return "".join(lines)
+
+    def apply_noise(self, noise: Noise) -> str:
+        # Returns the circuit text with the given noise.
+        if not isinstance(noise, Mapping):
+            return self._template % {gate: float(noise) for gate in NOISE_GATES}
+        noise = {gate: noise.get(gate, 0.0) for gate in NOISE_GATES}
+        if all(np.ndim(p) == 0 for p in noise.values()):
+            return self._template % {gate: float(p) for gate, p in noise.items()}
+        for gate, p in noise.items():
+            if np.ndim(p) and len(p) != self.num_qubits:
+                raise ValueError(
+                    f"{gate} noise has {len(p)} entries, expected one per qubit "
+                    f"({self.num_qubits})."
+                )
+        parts = [self.chunks[0]]
+        for (gate, targets), chunk in zip(self.slots, self.chunks[1:]):
+            parts.append(self._slot_lines(gate, targets, np.asarray(noise[gate])))
+            parts.append(chunk)
+        return "".join(parts)
+
+
+@lru_cache(maxsize=64)
+def circuit_structure(code: str, distance: int, rounds: int) -> CircuitStructure:
+    # Builds the noiseless structure of a code's circuit once per
+    # (code, distance, rounds).
+    return CircuitStructure(stim.Circuit(circuit_string(code, distance, rounds, 0)))
+
+
+def noisy_circuit_string(code: str, distance: int, rounds: int, noise: Noise) -> str:
+    return circuit_structure(code, distance, rounds).apply_noise(noise)
+
+
+def noisy_circuit(code: str, distance: int, rounds: int, noise: Noise) -> stim.Circuit:
+    return stim.Circuit(noisy_circuit_string(code, distance, rounds, noise))
@@ -0,0 +1,36 @@
+import importlib.util
+from functools import lru_cache
+from pathlib import Path
+from types import ModuleType
+from typing import Callable
+
+_ROOT = Path(__file__).resolve().parent.parent
+
+# Stim circuit string generators of the error correcting codes, keyed by code
+# name. Each maps to the file and name of a `(distance, rounds, p) -> str`
+# function. The files are loaded by path, because the `stim` folder would
+# otherwise shadow the `stim` package.
+CODES = {
+    "surface_code": ("surface_code/surface_code.py", "surface_code_circuit_string"),
+    "rep_code": ("stim/rep_code.py", "create_rep_code_stim_string"),
+}
+
+
+@lru_cache(maxsize=None)
+def _load_module(path: str) -> ModuleType:
+    spec = importlib.util.spec_from_file_location(Path(path).stem, _ROOT / path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def circuit_generator(code: str) -> Callable[[int, int, float], str]:
+    try:
+        path, name = CODES[code]
+    except KeyError:
+        raise KeyError(f"Unknown code {code!r}. Expected one of {list(CODES)}.")
+    return getattr(_load_module(path), name)
+
+
+def circuit_string(code: str, distance: int, rounds: int, p: float) -> str:
+    return circuit_generator(code)(distance, rounds, p)
@@ -0,0 +1,96 @@
+import json
+from typing import Iterator, Mapping, Optional
+
+import numpy as np
+
+# Reporting of the significant basis states of a statevector or probability
+# vector, without looping over all 2^n amplitudes in Python. States are found
+# with `np.nonzero` one chunk at a time, or with `np.argpartition` for the
+# top-k, and formatted lazily so that reports can be streamed.
+
+THRESHOLD = 0.000001
+CHUNK_SIZE = 1 << 20
+TEXT_TEMPLATE = "|{index}⟩ {amplitude} probability = {percent}%"
+
+
+def _as_arrays(amplitudes):
+    # Dense amplitudes, or a mapping from basis state index to amplitude such
+    # as `SparseStatevector.amplitudes`.
+    amplitudes = getattr(amplitudes, "amplitudes", amplitudes)
+    if isinstance(amplitudes, Mapping):
+        indices = np.array(sorted(amplitudes), dtype=object)
+        return indices, np.array([amplitudes[i] for i in indices])
+    return None, np.asarray(amplitudes)
+
+
+def significant_states(amplitudes, threshold=THRESHOLD, top: Optional[int] = None):
+    # Yield `(index, amplitude, probability)` of the basis states whose
+    # amplitude magnitude exceeds `threshold`, in increasing index order, or of
+    # the `top` most probable states, in decreasing probability order.
+    indices, values = _as_arrays(amplitudes)
+    if top is not None:
+        if top <= 0:
+            return
+        probabilities = np.abs(values) * np.abs(values)
+        top = min(top, len(values))
+        best = np.argpartition(probabilities, len(values) - top)[len(values) - top :]
+        best = best[np.argsort(-probabilities[best], kind="stable")]
+        for k in best:
+            if np.abs(values[k]) > threshold:
+                index = k if indices is None else indices[k]
+                yield int(index), values[k], probabilities[k]
+        return
+
+    for start in range(0, len(values), CHUNK_SIZE):
+        chunk = values[start : start + CHUNK_SIZE]
+        magnitudes = np.abs(chunk)
+        for k in np.nonzero(magnitudes > threshold)[0]:
+            index = start + k if indices is None else indices[start + k]
+            yield int(index), chunk[k], magnitudes[k] * magnitudes[k]
+
+
+def probabilities(amplitudes, threshold=THRESHOLD, top: Optional[int] = None):
+    # Get the probabilities of the significant basis states, keyed by index.
+    return {
+        index: float(probability)
+        for index, _, probability in significant_states(amplitudes, threshold, top)
+    }
+
+
+def format_text(
+    amplitudes,
+    template=TEXT_TEMPLATE,
+    threshold=THRESHOLD,
+    top: Optional[int] = None,
+    decimals=5,
+) -> Iterator[str]:
+    # Yield one line per significant basis state, formatted with `template`,
+    # whose fields are `index`, `amplitude`, `probability` and `percent`, the
+    # probability in percent rounded to `decimals`.
+    for index, amplitude, probability in significant_states(amplitudes, threshold, top):
+        yield template.format(
+            index=index,
+            amplitude=amplitude,
+            probability=probability,
+            percent=round(probability * 100, decimals),
+        )
+
+
+def format_json(
+    amplitudes, threshold=THRESHOLD, top: Optional[int] = None
+) -> Iterator[str]:
+    # Yield one JSON object per significant basis state, as JSON Lines.
+    for index, amplitude, probability in significant_states(amplitudes, threshold, top):
+        amplitude = complex(amplitude)
+        yield json.dumps(
+            {
+                "index": index,
+                "amplitude": [amplitude.real, amplitude.imag],
+                "probability": float(probability),
+            }
+        )
+
+
+def print_states(amplitudes, template=TEXT_TEMPLATE, **kwargs):
+    for line in format_text(amplitudes, template, **kwargs):
+        print(line)
@@ -0,0 +1,155 @@
+import argparse
+import json
+from pathlib import Path
+from typing import Iterator, Optional, Tuple, Union
+
+import numpy as np
+
+import stim
+from util.noise import noisy_circuit
+
+METADATA_FILE = "metadata.json"
+CIRCUIT_FILE = "circuit.stim"
+FORMATS = ("npy", "b8")
+
+
+def sample_to_files(
+    circuit: stim.Circuit,
+    shots: int,
+    path: Union[str, Path],
+    chunk_size: int = 100_000,
+    format: str = "npy",
+    seed: Optional[int] = None,
+) -> Path:
+    # Samples detection events and observable flips into the folder `path`.
+    # Shots are written in chunks of `chunk_size`, with each shot's bits packed
+    # 8 per byte in little-endian bit order, so memory stays bounded whatever
+    # the shot count.
+    # The "npy" format writes `detectors.npy` and `observables.npy` arrays of
+    # shape (shots, ceil(num_bits / 8)) through memory maps. The "b8" format
+    # has stim stream `detectors.b8` and `observables.b8` itself.
+    if format not in FORMATS:
+        raise ValueError(f"Unknown format {format!r}. Expected one of {FORMATS}.")
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+    sampler = circuit.compile_detector_sampler(seed=seed)
+    num_detectors = circuit.num_detectors
+    num_observables = circuit.num_observables
+
+    if format == "b8":
+        sampler.sample_write(
+            shots,
+            filepath=str(path / "detectors.b8"),
+            format="b8",
+            obs_out_filepath=str(path / "observables.b8"),
+            obs_out_format="b8",
+        )
+    else:
+        detectors = np.lib.format.open_memmap(
+            path / "detectors.npy",
+            mode="w+",
+            dtype=np.uint8,
+            shape=(shots, (num_detectors + 7) // 8),
+        )
+        observables = np.lib.format.open_memmap(
+            path / "observables.npy",
+            mode="w+",
+            dtype=np.uint8,
+            shape=(shots, (num_observables + 7) // 8),
+        )
+        for start in range(0, shots, chunk_size):
+            stop = min(start + chunk_size, shots)
+            detectors[start:stop], observables[start:stop] = sampler.sample(
+                stop - start, separate_observables=True, bit_packed=True
+            )
+            detectors.flush()
+            observables.flush()
+        del detectors, observables
+
+    circuit.to_file(path / CIRCUIT_FILE)
+    metadata = {
+        "format": format,
+        "shots": shots,
+        "num_detectors": num_detectors,
+        "num_observables": num_observables,
+        "bit_order": "little",
+        "chunk_size": chunk_size,
+        "seed": seed,
+    }
+    (path / METADATA_FILE).write_text(json.dumps(metadata, indent=2))
+    return path
+
+
+def load_metadata(path: Union[str, Path]) -> dict:
+    return json.loads((Path(path) / METADATA_FILE).read_text())
+
+
+def load_samples(path: Union[str, Path]) -> Tuple[np.ndarray, np.ndarray, dict]:
+    # Returns read-only, bit-packed detection events and observable flips
+    # written by `sample_to_files`, with their metadata. The "npy" format is
+    # memory mapped rather than read into memory.
+    path = Path(path)
+    metadata = load_metadata(path)
+    if metadata["format"] == "b8":
+        detectors = np.memmap(
+            path / "detectors.b8",
+            dtype=np.uint8,
+            mode="r",
+            shape=(metadata["shots"], (metadata["num_detectors"] + 7) // 8),
+        )
+        observables = np.memmap(
+            path / "observables.b8",
+            dtype=np.uint8,
+            mode="r",
+            shape=(metadata["shots"], (metadata["num_observables"] + 7) // 8),
+        )
+    else:
+        detectors = np.load(path / "detectors.npy", mmap_mode="r")
+        observables = np.load(path / "observables.npy", mmap_mode="r")
+    return detectors, observables, metadata
+
+
+def iter_sample_chunks(
+    path: Union[str, Path], chunk_size: int = 100_000, unpack: bool = False
+) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    # Yields (detection events, observable flips) chunks of at most
+    # `chunk_size` shots, unpacked to boolean arrays if `unpack` is set.
+    detectors, observables, metadata = load_samples(path)
+    for start in range(0, metadata["shots"], chunk_size):
+        dets = np.asarray(detectors[start : start + chunk_size])
+        obs = np.asarray(observables[start : start + chunk_size])
+        if unpack:
+            dets = np.unpackbits(
+                dets, axis=1, count=metadata["num_detectors"], bitorder="little"
+            ).astype(bool)
+            obs = np.unpackbits(
+                obs, axis=1, count=metadata["num_observables"], bitorder="little"
+            ).astype(bool)
+        yield dets, obs
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Sample a code's detection events and observable flips to disk."
+    )
+    parser.add_argument("path")
+    parser.add_argument("--code", default="surface_code")
+    parser.add_argument("--distance", type=int, default=3)
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--p", type=float, default=0.001)
+    parser.add_argument("--shots", type=int, default=1_000_000)
+    parser.add_argument("--chunk-size", type=int, default=100_000)
+    parser.add_argument("--format", choices=FORMATS, default="npy")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    circuit = noisy_circuit(args.code, args.distance, args.rounds, args.p)
+    sample_to_files(
+        circuit,
+        args.shots,
+        args.path,
+        chunk_size=args.chunk_size,
+        format=args.format,
+        seed=args.seed,
+    )
+    print(json.dumps(load_metadata(args.path), indent=2))
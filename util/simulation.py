@@ -0,0 +1,228 @@
+import hashlib
+from collections import OrderedDict
+from functools import lru_cache
+
+import numpy as np
+from qiskit import QuantumCircuit
+from qiskit.circuit import ControlledGate, ParameterExpression
+from qiskit.circuit.library import QFT
+from qiskit.circuit.library.standard_gates import get_standard_gate_name_mapping
+from qiskit.quantum_info import Statevector
+
+_STANDARD_GATES = get_standard_gate_name_mapping()
+
+
+def _is_standard(operation):
+    # Standard gates, and controlled versions of them, such as those from
+    # `XGate().control(3)`.
+    if type(_STANDARD_GATES.get(operation.name)) is type(operation):
+        return True
+    return isinstance(operation, ControlledGate) and _is_standard(operation.base_gate)
+
+
+def _update_param(h, param):
+    if isinstance(param, np.ndarray):
+        h.update(np.ascontiguousarray(param).tobytes())
+    elif isinstance(param, ParameterExpression):
+        h.update(str(param).encode())
+    else:
+        h.update(repr(param).encode())
+    h.update(b";")
+
+
+def _update_circuit(h, qc, definitions):
+    qubits = {bit: i for i, bit in enumerate(qc.qubits)}
+    clbits = {bit: i for i, bit in enumerate(qc.clbits)}
+    h.update(f"{qc.num_qubits},{qc.num_clbits}|".encode())
+    _update_param(h, qc.global_phase)
+    for instruction in qc.data:
+        operation = instruction.operation
+        h.update(operation.name.encode())
+        h.update(b"(")
+        for param in operation.params:
+            _update_param(h, param)
+        h.update(b")")
+        h.update(repr([qubits[q] for q in instruction.qubits]).encode())
+        h.update(repr([clbits[c] for c in instruction.clbits]).encode())
+        condition = getattr(operation, "condition", None)
+        if condition is not None:
+            h.update(repr(condition).encode())
+        # Custom gates, such as those from `to_gate`, are identified by their
+        # definitions rather than by their names.
+        standard = type(_STANDARD_GATES.get(operation.name)) is type(operation)
+        if not standard and getattr(operation, "definition", None) is not None:
+            key = id(operation)
+            if key not in definitions:
+                inner = hashlib.sha256()
+                _update_circuit(inner, operation.definition, definitions)
+                definitions[key] = inner.digest()
+            h.update(definitions[key])
+        h.update(b"\n")
+
+
+def circuit_fingerprint(qc: QuantumCircuit) -> str:
+    # Structural fingerprint of a circuit: a hash of its global phase, its
+    # instructions, their parameters and the indices of the bits they act on.
+    # Register names and labels do not change the fingerprint.
+    h = hashlib.sha256()
+    _update_circuit(h, qc, {})
+    return h.hexdigest()
+
+
+def apply_qft(amplitudes, qubits, inverse=False, do_swaps=True):
+    # Apply the QFT (or its inverse) on `qubits`, where `qubits[0]` is the least
+    # significant bit, as an FFT over the corresponding tensor axes. The last
+    # axis of `amplitudes` holds the 2^n amplitudes of each state, so a batch of
+    # states can be transformed at once. Without swaps, the QFT reverses the
+    # order of its output qubits and the inverse QFT that of its input qubits.
+    amplitudes = np.asarray(amplitudes, dtype=complex)
+    batch_shape = amplitudes.shape[:-1]
+    num_qubits = amplitudes.shape[-1].bit_length() - 1
+    m = len(qubits)
+    offset = len(batch_shape)
+    source = [offset + num_qubits - 1 - q for q in reversed(qubits)]
+    target = source[::-1] if not do_swaps else source
+    if inverse:
+        source, target = target, source
+    destination = [*range(offset + num_qubits - m, offset + num_qubits)]
+
+    tensor = amplitudes.reshape(batch_shape + (2,) * num_qubits)
+    tensor = np.moveaxis(tensor, source, destination).reshape(-1, 2**m)
+    if inverse:
+        tensor = np.fft.fft(tensor, axis=-1, norm="ortho")
+    else:
+        tensor = np.fft.ifft(tensor, axis=-1, norm="ortho")
+    tensor = tensor.reshape(batch_shape + (2,) * num_qubits)
+    return np.moveaxis(tensor, destination, target).reshape(amplitudes.shape)
+
+
+@lru_cache(maxsize=None)
+def _qft_references(num_qubits):
+    # Fingerprints of the definitions that `QFT(...)` gates and circuits have,
+    # both as a wrapped gate and as the inlined H, CP and SWAP gates, mapped to
+    # their `(inverse, do_swaps)` configuration.
+    references = {}
+    for do_swaps in (True, False):
+        for inverse in (False, True):
+            for qft in (
+                QFT(num_qubits, inverse=inverse, do_swaps=do_swaps),
+                QFT(num_qubits, inverse=not inverse, do_swaps=do_swaps).inverse(),
+            ):
+                definition = qft.to_gate().definition
+                inlined = definition.data[0].operation.definition
+                for circuit in (definition, inlined):
+                    references[circuit_fingerprint(circuit)] = (inverse, do_swaps)
+    sizes = {1, num_qubits + num_qubits * (num_qubits - 1) // 2}
+    sizes.add(max(sizes) + num_qubits // 2)
+    return references, sizes
+
+
+def qft_hook(operation):
+    # Recognize exact QFT and inverse QFT blocks by the structure of their
+    # definitions, whatever their names or labels. Standard gates are skipped
+    # before their definitions are built.
+    if _is_standard(operation):
+        return None
+    definition = getattr(operation, "definition", None)
+    if definition is None or operation.num_qubits > 64:
+        return None
+    references, sizes = _qft_references(operation.num_qubits)
+    if len(definition.data) not in sizes:
+        return None
+    config = references.get(circuit_fingerprint(definition))
+    if config is None:
+        return None
+    inverse, do_swaps = config
+    return lambda amplitudes, qubits: apply_qft(amplitudes, qubits, inverse, do_swaps)
+
+
+# Each hook takes an operation and returns either None or a function applying
+# it to the amplitudes, given the indices of the qubits it acts on. The
+# amplitudes may have leading batch axes.
+simulation_hooks = [qft_hook]
+
+
+def simulation_hook(operation):
+    # Get the function applying the operation from the first hook that
+    # recognizes it, if any.
+    for hook in simulation_hooks:
+        apply = hook(operation)
+        if apply is not None:
+            return apply
+    return None
+
+
+def evolve_statevector(state: Statevector, qc: QuantumCircuit) -> Statevector:
+    # Evolve the state by the circuit as `Statevector.evolve` does, except for
+    # the instructions recognized by `simulation_hooks`, which are applied
+    # directly to the amplitudes.
+    qubits = {bit: i for i, bit in enumerate(qc.qubits)}
+    segment = qc.copy_empty_like()
+    segment.global_phase = 0
+    for instruction in qc.data:
+        apply = simulation_hook(instruction.operation)
+        if apply is None:
+            # The instruction comes from a valid circuit with the same bits, so
+            # skip the argument checks of `append`.
+            segment._append(instruction)
+            continue
+        if segment.data:
+            state = state.evolve(segment)
+            segment = segment.copy_empty_like()
+        amplitudes = apply(state.data, [qubits[q] for q in instruction.qubits])
+        state = Statevector(amplitudes, dims=state.dims())
+    if segment.data:
+        state = state.evolve(segment)
+    if qc.global_phase:
+        state = Statevector(
+            state.data * np.exp(1j * float(qc.global_phase)), dims=state.dims()
+        )
+    return state
+
+
+class StatevectorCache:
+    # LRU cache of simulated statevectors keyed by circuit fingerprint, bounded
+    # by the total size of the cached amplitudes.
+
+    def __init__(self, max_bytes: int = 256 << 20):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()
+
+    def __len__(self):
+        return len(self._cache)
+
+    def get(self, qc: QuantumCircuit) -> Statevector:
+        key = circuit_fingerprint(qc)
+        state = self._cache.get(key)
+        if state is not None:
+            self.hits += 1
+            self._cache.move_to_end(key)
+            return state
+
+        self.misses += 1
+        state = evolve_statevector(Statevector.from_int(0, 2**qc.num_qubits), qc)
+        if state.data.nbytes <= self.max_bytes:
+            self._cache[key] = state
+            self.nbytes += state.data.nbytes
+            while self.nbytes > self.max_bytes:
+                _, evicted = self._cache.popitem(last=False)
+                self.nbytes -= evicted.data.nbytes
+        return state
+
+    def clear(self):
+        self._cache.clear()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+
+
+statevector_cache = StatevectorCache()
+
+
+def simulate_statevector(qc: QuantumCircuit) -> Statevector:
+    # Simulate the circuit, reusing the result of any structurally identical
+    # circuit simulated before.
+    return statevector_cache.get(qc)
@@ -0,0 +1,207 @@
+import cmath
+from functools import lru_cache
+
+import numpy as np
+from qiskit import QuantumCircuit
+from qiskit.circuit import ControlledGate
+from qiskit.circuit.library.standard_gates import get_standard_gate_name_mapping
+from qiskit.quantum_info import Operator, Statevector
+
+from util.simulation import evolve_statevector
+
+# Sparse simulation of circuits whose states have few nonzero amplitudes, such
+# as classical arithmetic on superpositions of a few inputs. The state is a
+# dict from basis state index to amplitude, with Python integers as indices so
+# that registers can be wider than 64 qubits. X, SWAP and controlled gates are
+# applied as bit operations on the indices, diagonal gates as phases, and
+# other small gates, such as H, by branching each basis state. Gates larger
+# than `MAX_MATRIX_QUBITS` are decomposed into their definitions.
+
+MAX_MATRIX_QUBITS = 3
+TOLERANCE = 1e-12  # Amplitudes smaller than this are dropped
+
+_STANDARD_GATES = get_standard_gate_name_mapping()
+
+
+@lru_cache(maxsize=1024)
+def _standard_matrix(name, params):
+    return Operator(type(_STANDARD_GATES[name])(*params)).data
+
+
+def _matrix(operation):
+    # Matrix of the operation, or None if it has none or is too large.
+    if operation.num_qubits > MAX_MATRIX_QUBITS or operation.num_clbits:
+        return None
+    params = tuple(operation.params)
+    standard = type(_STANDARD_GATES.get(operation.name)) is type(operation)
+    try:
+        if standard and all(isinstance(p, (int, float)) for p in params):
+            return _standard_matrix(operation.name, params)
+        return Operator(operation).data
+    except Exception:
+        return None
+
+
+class SparseStatevector:
+    # Statevector stored as a dict of nonzero amplitudes keyed by basis state
+    # index, where qubit q is bit q of the index.
+
+    def __init__(self, num_qubits, amplitudes=None):
+        self.num_qubits = num_qubits
+        self.amplitudes = {0: 1.0 + 0j} if amplitudes is None else dict(amplitudes)
+
+    def __len__(self):
+        return len(self.amplitudes)
+
+    def apply(self, operation, qubits):
+        # Apply the operation on the qubits with the given indices, in place.
+        self.amplitudes = _apply(self.amplitudes, operation, list(qubits))
+        return self
+
+    def probabilities_dict(self):
+        return {i: float(abs(amp) ** 2) for i, amp in sorted(self.amplitudes.items())}
+
+    def round(self, decimals):
+        # Copy of the state with its amplitudes rounded to `decimals`.
+        return SparseStatevector(
+            self.num_qubits,
+            {i: np.round(amp, decimals) for i, amp in self.amplitudes.items()},
+        )
+
+    def to_statevector(self) -> Statevector:
+        data = np.zeros(2**self.num_qubits, dtype=complex)
+        for i, amp in self.amplitudes.items():
+            data[i] = amp
+        return Statevector(data)
+
+
+class DenseStatevector:
+    # Dense statevector with the interface of `SparseStatevector`, which
+    # `simulate_sparse` falls back to once the state has too many branches.
+    # `amplitudes` is the array of all 2^n amplitudes.
+
+    def __init__(self, statevector: Statevector):
+        self.num_qubits = statevector.num_qubits
+        self.statevector = statevector
+
+    @property
+    def amplitudes(self):
+        return self.statevector.data
+
+    def __len__(self):
+        return int(np.count_nonzero(np.abs(self.amplitudes) > TOLERANCE))
+
+    def apply(self, operation, qubits):
+        self.statevector = self.statevector.evolve(operation, qargs=list(qubits))
+        return self
+
+    def probabilities_dict(self):
+        probabilities = np.abs(self.amplitudes) ** 2
+        return {
+            int(i): float(probabilities[i])
+            for i in np.nonzero(probabilities > TOLERANCE**2)[0]
+        }
+
+    def round(self, decimals):
+        return DenseStatevector(
+            Statevector(
+                np.round(self.amplitudes, decimals), dims=self.statevector.dims()
+            )
+        )
+
+    def to_statevector(self) -> Statevector:
+        return self.statevector
+
+
+def _apply(amplitudes, operation, qubits):
+    name = operation.name
+    if name in ("barrier", "id", "delay"):
+        return amplitudes
+    if name == "x":
+        mask = 1 << qubits[0]
+        return {i ^ mask: amp for i, amp in amplitudes.items()}
+    if name == "swap":
+        q0, q1 = qubits
+        return {
+            i ^ (((i >> q0 ^ i >> q1) & 1) * ((1 << q0) | (1 << q1))): amp
+            for i, amp in amplitudes.items()
+        }
+    if isinstance(operation, ControlledGate):
+        # Apply the base gate to the basis states whose controls match.
+        controls = qubits[: operation.num_ctrl_qubits]
+        mask = sum(1 << q for q in controls)
+        value = sum(
+            1 << q for j, q in enumerate(controls) if operation.ctrl_state >> j & 1
+        )
+        active = {i: amp for i, amp in amplitudes.items() if i & mask == value}
+        if not active:
+            return amplitudes
+        result = {i: amp for i, amp in amplitudes.items() if i & mask != value}
+        targets = qubits[operation.num_ctrl_qubits :]
+        result.update(_apply(active, operation.base_gate, targets))
+        return result
+
+    matrix = _matrix(operation)
+    if matrix is None:
+        definition = operation.definition
+        if definition is None:
+            raise ValueError(f"Cannot simulate {name!r} sparsely.")
+        inner = {bit: qubits[k] for k, bit in enumerate(definition.qubits)}
+        for instruction in definition.data:
+            amplitudes = _apply(
+                amplitudes,
+                instruction.operation,
+                [inner[q] for q in instruction.qubits],
+            )
+        if definition.global_phase:
+            phase = cmath.exp(1j * float(definition.global_phase))
+            amplitudes = {i: amp * phase for i, amp in amplitudes.items()}
+        return amplitudes
+
+    # Local index of each basis state, with qubits[0] as the least significant bit
+    def local(i):
+        return sum(((i >> q) & 1) << k for k, q in enumerate(qubits))
+
+    if np.count_nonzero(matrix - np.diag(np.diag(matrix))) == 0:
+        phases = np.diag(matrix)
+        return {i: amp * phases[local(i)] for i, amp in amplitudes.items()}
+
+    mask = sum(1 << q for q in qubits)
+    offsets = [
+        sum(((j >> k) & 1) << q for k, q in enumerate(qubits))
+        for j in range(len(matrix))
+    ]
+    result = {}
+    columns = [np.nonzero(matrix[:, j])[0] for j in range(len(matrix))]
+    for i, amp in amplitudes.items():
+        j = local(i)
+        base = i & ~mask
+        for k in columns[j]:
+            key = base | offsets[k]
+            result[key] = result.get(key, 0) + matrix[k, j] * amp
+    return {i: amp for i, amp in result.items() if abs(amp) > TOLERANCE}
+
+
+def simulate_sparse(qc: QuantumCircuit, max_branches=1 << 16, max_dense_qubits=26):
+    # Simulate the circuit from |0⟩ as a `SparseStatevector`. Once the state
+    # has more than `max_branches` nonzero amplitudes, it is converted to a
+    # dense `Statevector`, which simulates the rest of the circuit, and is
+    # returned as a `DenseStatevector` with the same interface.
+    qubits = {bit: i for i, bit in enumerate(qc.qubits)}
+    state = SparseStatevector(qc.num_qubits)
+    for k, instruction in enumerate(qc.data):
+        state.apply(instruction.operation, [qubits[q] for q in instruction.qubits])
+        if len(state) > max_branches:
+            if qc.num_qubits > max_dense_qubits:
+                raise ValueError(
+                    f"{len(state)} branches exceed {max_branches}, and "
+                    f"{qc.num_qubits} qubits are too many for a dense state."
+                )
+            rest = qc.copy_empty_like()
+            for remaining in qc.data[k + 1 :]:
+                rest.append(remaining)
+            return DenseStatevector(evolve_statevector(state.to_statevector(), rest))
+    if qc.global_phase:
+        phase = cmath.exp(1j * float(qc.global_phase))
+        state.amplitudes = {i: amp * phase for i, amp in state.amplitudes.items()}
+    return state
@@ -1,24 +1,120 @@
 import numpy as np
-from IPython.display import display
-from qiskit.quantum_info import Statevector, partial_trace
-from qiskit.visualization import array_to_latex
-
-
-def get_partial_statevector(qc, qargs, label="\\psi"):
-    # Get density matrix for desired qubits
-    full_statevector = Statevector(qc)
-    partial_density_matrix = partial_trace(full_statevector, qargs)
-
-    # Extract statevector out of the density matrix
-    partial_statevector = np.diagonal(partial_density_matrix)
-
-    display(
-        array_to_latex(
-            partial_statevector,
-            precision=3,
-            prefix=f"{label} =",
-            max_size=2**qc.num_qubits,
-        )
+from qiskit import QuantumCircuit
+from qiskit.quantum_info import Statevector
+
+from util.display import display_latex
+from util.simulation import evolve_statevector, simulate_statevector
+
+
+def _probability_tensor(statevector):
+    # View |amp|^2 as a tensor with one axis per qubit, where qubit 0 is the
+    # last axis.
+    amplitudes = np.asarray(statevector)
+    num_qubits = amplitudes.size.bit_length() - 1
+    return np.abs(amplitudes.reshape((2,) * num_qubits)) ** 2
+
+
+def _marginal(probabilities, qargs):
+    num_qubits = probabilities.ndim
+    traced_axes = tuple(num_qubits - 1 - q for q in qargs)
+    return probabilities.sum(axis=traced_axes).reshape(-1)
+
+
+def marginal_probabilities(statevector, qargs):
+    # Get the probabilities of the remaining qubits after tracing out `qargs`,
+    # i.e., the diagonal of the reduced density matrix, without building it.
+    return _marginal(_probability_tensor(statevector), qargs)
+
+
+def display_statevector(statevector, label="\\psi", max_size=None):
+    display_latex(
+        statevector,
+        precision=3,
+        prefix=f"{label} =",
+        max_size=max_size or len(statevector),
     )
 
+
+def get_partial_statevector(state, qargs, label="\\psi", show=True):
+    # Get the probabilities of the qubits not in `qargs`. `state` is a circuit,
+    # which is simulated, or an already simulated statevector.
+    if isinstance(state, QuantumCircuit):
+        state = simulate_statevector(state)
+    partial_statevector = marginal_probabilities(state, qargs)
+
+    if show:
+        display_statevector(partial_statevector, label, max_size=len(state))
+
     return partial_statevector
+
+
+def get_partial_statevectors(state, qargs, show=True):
+    # Get the probabilities of the qubits not in each of the `qargs` lists,
+    # keyed by label, from a single state. `state` is a circuit, which is
+    # simulated once, or an already simulated statevector.
+    if isinstance(state, QuantumCircuit):
+        state = simulate_statevector(state)
+    probabilities = _probability_tensor(state)
+    partial_statevectors = {
+        label: _marginal(probabilities, traced) for label, traced in qargs.items()
+    }
+
+    if show:
+        for label, partial_statevector in partial_statevectors.items():
+            display_statevector(
+                partial_statevector, label, max_size=2**probabilities.ndim
+            )
+
+    return partial_statevectors
+
+
+class IncrementalStatevector:
+    # Statevector that follows a circuit as it grows. Each `update` evolves the
+    # current state by only the instructions appended since the last update,
+    # so simulating a circuit built over many iterations costs the same as
+    # simulating it once.
+
+    def __init__(self, qc):
+        self.qc = qc
+        self.state = Statevector.from_int(0, 2**qc.num_qubits)
+        self.position = 0  # Number of instructions of `qc` already applied
+        self.global_phase = 0  # Global phase of `qc` already applied
+        self._snapshots = {}
+
+    def update(self):
+        # Evolve the state by the new instructions, and by the change in the
+        # circuit's global phase since the last update.
+        if len(self.qc.data) < self.position:
+            raise ValueError("Instructions were removed from the circuit.")
+        phase = self.qc.global_phase - self.global_phase
+        if len(self.qc.data) > self.position or phase:
+            segment = self.qc.copy_empty_like()
+            segment.global_phase = phase
+            for instruction in self.qc.data[self.position :]:
+                segment.append(instruction)
+            self.state = evolve_statevector(self.state, segment)
+            self.position = len(self.qc.data)
+            self.global_phase = self.qc.global_phase
+        return self.state
+
+    def snapshot(self, name):
+        # Save the up-to-date state under `name`.
+        state = self.update()
+        self._snapshots[name] = (self.position, state, self.global_phase)
+
+    def rollback(self, name):
+        # Restore the state saved under `name`, and remove the instructions
+        # appended to the circuit since then, along with the snapshots taken
+        # after them.
+        if name not in self._snapshots:
+            raise KeyError(f"No snapshot named {name!r}.")
+        self.position, self.state, self.global_phase = self._snapshots[name]
+        while len(self.qc.data) > self.position:
+            self.qc.data.pop()
+        self.qc.global_phase = self.global_phase
+        self._snapshots = {
+            key: snapshot
+            for key, snapshot in self._snapshots.items()
+            if snapshot[0] <= self.position
+        }
+        return self.state
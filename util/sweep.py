@@ -0,0 +1,180 @@
+import argparse
+import itertools
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Iterable, List, Optional
+
+import numpy as np
+
+from util.circuit_cache import CircuitCache, compile_circuit
+from util.decoding import CachedDecoder
+from util.noise import noisy_circuit_string
+from util.qec import CODES
+
+
+@dataclass(frozen=True)
+class SweepTask:
+    code: str
+    distance: int
+    rounds: int
+    p: float
+
+
+@dataclass(frozen=True)
+class SweepResult:
+    code: str
+    distance: int
+    rounds: int
+    p: float
+    shots: int
+    errors: int
+    seconds: float
+    decoder_hit_rate: float
+
+    @property
+    def logical_error_rate(self) -> float:
+        return self.errors / self.shots if self.shots else float("nan")
+
+
+def make_tasks(
+    codes: Iterable[str],
+    distances: Iterable[int],
+    rounds: Iterable[int],
+    ps: Iterable[float],
+) -> List[SweepTask]:
+    # Returns one task per point in the (code, distance, rounds, p) grid.
+    return [
+        SweepTask(code, distance, r, p)
+        for code, distance, r, p in itertools.product(codes, distances, rounds, ps)
+    ]
+
+
+def run_task(
+    task: SweepTask,
+    max_shots: int,
+    max_errors: int,
+    batch_size: int = 10_000,
+    seed: Optional[int] = None,
+    cache_size: int = 100_000,
+    circuit_cache: Optional[dict] = None,
+) -> SweepResult:
+    # Samples the task's circuit in batches and decodes each batch with
+    # minimum-weight perfect matching, until `max_errors` logical errors or
+    # `max_shots` shots are reached. Syndromes are deduplicated through an LRU
+    # cache of `cache_size` entries. The parsed circuit and its decoder come
+    # from a `CircuitCache` built with the `circuit_cache` keyword arguments,
+    # or are built in memory when `circuit_cache` is None.
+    start = time.perf_counter()
+    load = (
+        compile_circuit if circuit_cache is None else CircuitCache(**circuit_cache).load
+    )
+    entry = load(
+        noisy_circuit_string(task.code, task.distance, task.rounds, task.p),
+        noise=task.p,
+    )
+    circuit = entry.circuit
+    sampler = circuit.compile_detector_sampler(seed=seed)
+    decoder = CachedDecoder(entry.matching, circuit.num_detectors, max_size=cache_size)
+
+    shots = 0
+    errors = 0
+    while shots < max_shots and errors < max_errors:
+        num_shots = min(batch_size, max_shots - shots)
+        detection_events, observable_flips = sampler.sample(
+            num_shots, separate_observables=True, bit_packed=True
+        )
+        predictions = decoder.decode_batch(detection_events, bit_packed=True)
+        observable_flips = np.unpackbits(
+            observable_flips,
+            axis=1,
+            count=circuit.num_observables,
+            bitorder="little",
+        ).astype(bool)
+        errors += int(np.sum(np.any(predictions != observable_flips, axis=1)))
+        shots += num_shots
+
+    return SweepResult(
+        **asdict(task),
+        shots=shots,
+        errors=errors,
+        seconds=time.perf_counter() - start,
+        decoder_hit_rate=decoder.hit_rate,
+    )
+
+
+def sweep(
+    tasks: Iterable[SweepTask],
+    max_shots: int = 1_000_000,
+    max_errors: int = 100,
+    batch_size: int = 10_000,
+    max_workers: Optional[int] = None,
+    seed: Optional[int] = None,
+    cache_size: int = 100_000,
+    circuit_cache: Optional[dict] = None,
+) -> List[SweepResult]:
+    # Runs the tasks across a process pool and returns their results in task
+    # order. Task `i` is seeded with `seed + i` when a seed is given.
+    tasks = list(tasks)
+    seeds = [None if seed is None else seed + i for i in range(len(tasks))]
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(
+                run_task,
+                task,
+                max_shots,
+                max_errors,
+                batch_size,
+                s,
+                cache_size,
+                circuit_cache,
+            )
+            for task, s in zip(tasks, seeds)
+        ]
+        return [future.result() for future in futures]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Sweep logical error rates over (code, distance, rounds, p)."
+    )
+    parser.add_argument("--codes", nargs="+", default=list(CODES), choices=CODES)
+    parser.add_argument("--distances", nargs="+", type=int, default=[3, 5, 7])
+    parser.add_argument("--rounds", nargs="+", type=int, default=[10])
+    parser.add_argument("--ps", nargs="+", type=float, default=[0.001, 0.005, 0.01])
+    parser.add_argument("--max-shots", type=int, default=1_000_000)
+    parser.add_argument("--max-errors", type=int, default=100)
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--cache-size", type=int, default=100_000)
+    parser.add_argument(
+        "--circuit-cache-dir",
+        default=None,
+        help="Cache parsed circuits in this folder. Off by default.",
+    )
+    args = parser.parse_args()
+
+    results = sweep(
+        make_tasks(args.codes, args.distances, args.rounds, args.ps),
+        max_shots=args.max_shots,
+        max_errors=args.max_errors,
+        batch_size=args.batch_size,
+        max_workers=args.workers,
+        seed=args.seed,
+        cache_size=args.cache_size,
+        circuit_cache=(
+            None
+            if args.circuit_cache_dir is None
+            else {"directory": args.circuit_cache_dir}
+        ),
+    )
+    print(
+        "code,distance,rounds,p,shots,errors,logical_error_rate,seconds,"
+        "decoder_hit_rate"
+    )
+    for r in results:
+        print(
+            f"{r.code},{r.distance},{r.rounds},{r.p},{r.shots},{r.errors},"
+            f"{r.logical_error_rate:.3e},{r.seconds:.2f},{r.decoder_hit_rate:.3f}"
+        )
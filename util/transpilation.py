@@ -0,0 +1,215 @@
+import hashlib
+import json
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import List, Optional, Union
+
+import qiskit
+from qiskit import QuantumCircuit, qpy, transpile
+
+from util.simulation import circuit_fingerprint
+
+# Sibling of the circuit cache of `util.circuit_cache`, which needs Stim, under
+# the same root
+TRANSPILE_CACHE_DIR = (
+    Path(os.environ.get("QUANTUM_CACHE_DIR", Path.home() / ".cache" / "quantum"))
+    / "transpile"
+)
+
+
+def target_properties(backend) -> Optional[list]:
+    # Error rates and durations of every instruction on every qubit of the
+    # backend's target, which drive layout and routing from optimization
+    # level 1, or None for a backend without a target.
+    target = getattr(backend, "target", None)
+    if target is None:
+        return None
+    return sorted(
+        [name, list(qargs or ()), props.error, props.duration]
+        for name in target.operation_names
+        for qargs, props in target[name].items()
+        if props is not None
+    )
+
+
+def transpile_key(
+    qc: QuantumCircuit,
+    coupling_map=None,
+    basis_gates=None,
+    optimization_level: int = 1,
+    seed_transpiler: Optional[int] = None,
+    properties=None,
+) -> str:
+    # Content address of a transpilation: the SHA-256 of the circuit's
+    # fingerprint, which covers its global phase, and register names, the
+    # coupling map, the basis gates, the optimization level, the seed, the
+    # backend's `target_properties` and the qiskit version. Parameters are
+    # identified by name only.
+    if hasattr(coupling_map, "get_edges"):
+        coupling_map = coupling_map.get_edges()
+    edges = None if coupling_map is None else sorted(map(list, coupling_map))
+    payload = json.dumps(
+        [
+            circuit_fingerprint(qc),
+            [(r.name, r.size) for r in qc.qregs + qc.cregs],
+            edges,
+            None if basis_gates is None else sorted(basis_gates),
+            optimization_level,
+            seed_transpiler,
+            properties,
+            qiskit.__version__,
+        ]
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _rebind_parameters(result: QuantumCircuit, qc: QuantumCircuit):
+    # Replace the parameters of a loaded circuit by the caller's parameters of
+    # the same names, since the key ignores the identity of parameters.
+    parameters = {p.name: p for p in qc.parameters}
+    mapping = {
+        p: parameters[p.name] for p in result.parameters if p != parameters[p.name]
+    }
+    return result.assign_parameters(mapping) if mapping else result
+
+
+def _transpile(qc, options):
+    return transpile(qc, **options)
+
+
+class TranspileCache:
+    # On-disk cache of transpiled circuits, keyed by `transpile_key` and stored
+    # with qpy, one file per circuit. The modification time of a file is
+    # refreshed on every hit, and the least recently used files are evicted
+    # once the cache grows past `max_bytes`.
+
+    def __init__(
+        self,
+        directory: Union[str, Path] = TRANSPILE_CACHE_DIR,
+        max_bytes: int = 256 << 20,
+    ):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def transpile(
+        self,
+        circuits: Union[QuantumCircuit, List[QuantumCircuit]],
+        backend=None,
+        coupling_map=None,
+        basis_gates=None,
+        optimization_level: int = 1,
+        seed_transpiler: Optional[int] = None,
+        workers: Optional[int] = None,
+    ):
+        # Transpile a circuit or a list of circuits like `qiskit.transpile`,
+        # returning cached results where available. A backend provides the
+        # coupling map and basis gates in place of `coupling_map` and
+        # `basis_gates`. Cache misses in a list are transpiled
+        # across `workers` processes.
+        properties = None
+        if backend is not None:
+            coupling_map = backend.coupling_map
+            basis_gates = list(backend.operation_names)
+            properties = target_properties(backend)
+        single = isinstance(circuits, QuantumCircuit)
+        circuits = [circuits] if single else list(circuits)
+
+        keys = [
+            transpile_key(
+                qc,
+                coupling_map,
+                basis_gates,
+                optimization_level,
+                seed_transpiler,
+                properties,
+            )
+            for qc in circuits
+        ]
+        results = [self._load(key) for key in keys]
+        results = [
+            None if result is None else _rebind_parameters(result, qc)
+            for result, qc in zip(results, circuits)
+        ]
+        missing = [i for i, result in enumerate(results) if result is None]
+        self.hits += len(circuits) - len(missing)
+        self.misses += len(missing)
+
+        if missing:
+            options = {
+                "backend": backend,
+                "coupling_map": None if backend is not None else coupling_map,
+                "basis_gates": None if backend is not None else basis_gates,
+                "optimization_level": optimization_level,
+                "seed_transpiler": seed_transpiler,
+            }
+            if len(missing) == 1 or workers == 1:
+                transpiled = [_transpile(circuits[i], options) for i in missing]
+            else:
+                with ProcessPoolExecutor(max_workers=workers) as pool:
+                    futures = [
+                        pool.submit(_transpile, circuits[i], options) for i in missing
+                    ]
+                    transpiled = [future.result() for future in futures]
+            for i, qc in zip(missing, transpiled):
+                self._store(keys[i], qc)
+                results[i] = qc
+            self.evict()
+
+        return results[0] if single else results
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.qpy"
+
+    def _load(self, key: str) -> Optional[QuantumCircuit]:
+        path = self._path(key)
+        if not path.is_file():
+            return None
+        os.utime(path)
+        with open(path, "rb") as f:
+            return qpy.load(f)[0]
+
+    def _store(self, key: str, qc: QuantumCircuit):
+        # Writes to a temporary file first, so that concurrent readers never see
+        # a partial file.
+        self.directory.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+        with os.fdopen(fd, "wb") as f:
+            qpy.dump(qc, f)
+        os.replace(tmp, self._path(key))
+
+    def _entries(self):
+        if not self.directory.is_dir():
+            return []
+        return list(self.directory.glob("*.qpy"))
+
+    @property
+    def size(self) -> int:
+        return sum(e.stat().st_size for e in self._entries())
+
+    def evict(self, max_bytes: Optional[int] = None):
+        # Removes the least recently used files until the cache fits in
+        # `max_bytes`.
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        entries = sorted(self._entries(), key=lambda e: e.stat().st_mtime)
+        sizes = [e.stat().st_size for e in entries]
+        total = sum(sizes)
+        for entry, size in zip(entries, sizes):
+            if total <= max_bytes:
+                break
+            entry.unlink(missing_ok=True)
+            total -= size
+
+    def clear(self):
+        self.evict(max_bytes=0)
+
+
+transpile_cache = TranspileCache()
+
+
+def cached_transpile(circuits, backend=None, **kwargs):
+    # Transpile through the default on-disk cache.
+    return transpile_cache.transpile(circuits, backend, **kwargs)